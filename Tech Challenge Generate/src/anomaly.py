@@ -0,0 +1,246 @@
+"""
+Online per-route anomaly detection for newly arrived months.
+
+Each route keeps a small state row (Outputs/models/anomaly_state.parquet):
+- season_1..season_12: exponentially weighted mean of log(1 + passengers)
+  for each calendar month (the seasonal baseline)
+- level, var: EWMA mean and variance of the residual against that baseline
+- optionally the SARIMA one-step prediction interval for the next month
+
+Scoring a month is a few vector operations over the routes present in it, and
+nothing from the history is re-read. A route is flagged when its residual is
+more than `threshold` EWMA standard deviations from the EWMA level, or when
+the value falls outside the stored SARIMA interval.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import instrument
+from route_index import ROUTE_KEY
+
+DEFAULT_STATE_PATH = os.path.join("Outputs", "models", "anomaly_state.parquet")
+MONTHS = range(1, 13)
+SEASON_COLUMNS = [f"season_{m}" for m in MONTHS]
+SEASON_COUNT_COLUMNS = [f"season_n_{m}" for m in MONTHS]
+STATE_COLUMNS = (ROUTE_KEY + ["route", "last_date", "n", "level", "var"] + SEASON_COLUMNS + SEASON_COUNT_COLUMNS
+                 + ["next_date", "sarima_lower", "sarima_upper"])
+SCORE_COLUMNS = ["date"] + ROUTE_KEY + ["route", "passengers_total", "expected", "z", "sarima_lower",
+                                        "sarima_upper", "flag", "reason"]
+
+
+def empty_state():
+    state = pd.DataFrame({col: pd.Series(dtype=float) for col in STATE_COLUMNS})
+    for col in ROUTE_KEY + ["route"]:
+        state[col] = state[col].astype(object)
+    state["last_date"] = pd.Series(dtype="datetime64[ns]")
+    state["next_date"] = pd.Series(dtype="datetime64[ns]")
+    return state
+
+
+class AnomalyDetector:
+    """
+    Streaming detector over monthly route totals.
+
+    Parameters:
+    - alpha: EWMA weight of the newest residual (level and variance)
+    - season_alpha: Weight of the newest value in its calendar month's baseline
+    - threshold: Flag when |z| is above this
+    - warmup: Residuals a route needs before it can be flagged
+    - min_sd: Floor for the residual standard deviation (log scale, ~2%)
+    """
+
+    def __init__(self, state=None, alpha=0.2, season_alpha=0.3, threshold=3.0, warmup=6, min_sd=0.02):
+        self.state = empty_state() if state is None else state.reset_index(drop=True)
+        self.alpha = alpha
+        self.season_alpha = season_alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_sd = min_sd
+        self.lookup = {key: pos for pos, key in enumerate(self.state[ROUTE_KEY].itertuples(index=False, name=None))}
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH, **kwargs):
+        """Detector with the state saved at path (or empty if there is none)."""
+        state = pd.read_parquet(path) if os.path.exists(path) else None
+        return cls(state=state, **kwargs)
+
+    def save(self, path=DEFAULT_STATE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        self.state.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def last_date(self):
+        """Latest month seen by any route (None for an empty state)."""
+        return None if self.state.empty else self.state["last_date"].max()
+
+    def positions(self, keys):
+        """State rows for route keys, adding empty rows for new routes."""
+        new = [key for key in dict.fromkeys(keys) if key not in self.lookup]
+        if new:
+            rows = pd.DataFrame(new, columns=ROUTE_KEY).reindex(columns=STATE_COLUMNS)
+            rows["route"] = rows["australian_port"] + " → " + rows["foreign_port"]
+            rows[["n", "level", "var"] + SEASON_COLUMNS + SEASON_COUNT_COLUMNS] = 0.0
+            rows["last_date"] = pd.NaT
+            rows["next_date"] = pd.NaT
+            start = len(self.state)
+            self.state = rows if self.state.empty else pd.concat([self.state, rows], ignore_index=True)
+            self.lookup.update({key: start + i for i, key in enumerate(new)})
+        return np.array([self.lookup[key] for key in keys], dtype=np.int64)
+
+    def update_month(self, date, month_rows):
+        """
+        Score and absorb one month (one row per route with passengers_total).
+
+        Routes that already saw this month are ignored. Returns the scored rows.
+        """
+        keys = list(month_rows[ROUTE_KEY].itertuples(index=False, name=None))
+        pos = self.positions(keys)
+        seen = self.state["last_date"].to_numpy()[pos]
+        fresh = ~(seen >= np.datetime64(date))
+        pos, month_rows = pos[fresh], month_rows[fresh]
+        if len(pos) == 0:
+            return pd.DataFrame(columns=SCORE_COLUMNS)
+
+        st = self.state
+        value = month_rows["passengers_total"].to_numpy(dtype=float)
+        y = np.log1p(np.maximum(value, 0.0))
+        m = date.month
+        season = st[f"season_{m}"].to_numpy()[pos]
+        season_n = st[f"season_n_{m}"].to_numpy()[pos]
+        n = st["n"].to_numpy()[pos]
+        level = st["level"].to_numpy()[pos]
+        var = st["var"].to_numpy()[pos]
+
+        has_base = season_n > 0
+        resid = y - season
+        sd = np.maximum(np.sqrt(var), self.min_sd)
+        ready = has_base & (n >= self.warmup)
+        z = np.where(ready, (resid - level) / sd, np.nan)
+        z_flag = ready & (np.abs(z) > self.threshold)
+
+        lower = st["sarima_lower"].to_numpy()[pos]
+        upper = st["sarima_upper"].to_numpy()[pos]
+        has_interval = (st["next_date"].to_numpy()[pos] == np.datetime64(date)) & np.isfinite(lower)
+        outside = has_interval & ((value < lower) | (value > upper))
+
+        scored = month_rows[ROUTE_KEY].copy()
+        scored.insert(0, "date", date)
+        scored["route"] = st["route"].to_numpy()[pos]
+        scored["passengers_total"] = value
+        scored["expected"] = np.where(has_base, np.expm1(season + level), np.nan)
+        scored["z"] = z
+        scored["sarima_lower"] = np.where(has_interval, lower, np.nan)
+        scored["sarima_upper"] = np.where(has_interval, upper, np.nan)
+        scored["flag"] = z_flag | outside
+        scored["reason"] = np.select([z_flag & outside, z_flag, outside], ["ewma+sarima", "ewma", "sarima"], "")
+
+        # Absorb the month; a flagged residual is clipped so one outlier does not inflate the variance
+        delta = resid - level
+        delta = np.where(ready, np.clip(delta, -self.threshold * sd, self.threshold * sd), delta)
+        first = has_base & (n == 0)
+        new_level = np.where(first, resid, level + self.alpha * delta)
+        new_var = np.where(first, 0.0, (1 - self.alpha) * (var + self.alpha * delta * delta))
+        st.loc[pos, "level"] = np.where(has_base, new_level, level)
+        st.loc[pos, "var"] = np.where(has_base, new_var, var)
+        st.loc[pos, "n"] = n + has_base
+        st.loc[pos, f"season_{m}"] = np.where(has_base, season + self.season_alpha * (y - season), y)
+        st.loc[pos, f"season_n_{m}"] = season_n + 1
+        st.loc[pos, "last_date"] = date
+        return scored
+
+    def score(self, rows):
+        """
+        Score cleaned rows (any number of months, any order) month by month.
+
+        Rows are summed per route and month first. Returns the scored rows of
+        all months; use the flag column to pick alerts.
+        """
+        if rows.empty:
+            return pd.DataFrame(columns=SCORE_COLUMNS)
+        monthly = (rows.groupby(["date"] + ROUTE_KEY, observed=True)["passengers_total"].sum()
+                   .reset_index())
+        for col in ROUTE_KEY:
+            monthly[col] = monthly[col].astype(str)
+        scored = [self.update_month(date, group.reset_index(drop=True))
+                  for date, group in monthly.groupby("date", sort=True)]
+        return pd.concat(scored, ignore_index=True)
+
+    def refresh_intervals(self, index, cache_dir=None, alpha=0.05, workers=None):
+        """
+        Store the SARIMA one-step prediction interval for each route's next month.
+
+        Uses model_store.ModelStore, so after the first run each route only
+        extends its cached fit by the new months. This is the optional, slower
+        part; run it after the alerts for the current month have been sent.
+        """
+        from batch_forecast import limit_blas_threads
+
+        keys = [key for key in self.lookup if index.column_for(*key) is not None]
+        series = [index.series(*key) for key in keys]
+        with ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads) as pool:
+            intervals = instrument.map_collected(pool, one_step_interval, keys, series, [cache_dir] * len(keys),
+                                                 [alpha] * len(keys))
+        for key, (next_date, lower, upper) in zip(keys, intervals):
+            pos = self.lookup[key]
+            self.state.loc[pos, ["next_date", "sarima_lower", "sarima_upper"]] = [next_date, lower, upper]
+        self.state["next_date"] = pd.to_datetime(self.state["next_date"])
+
+
+def one_step_interval(route_key, ts, cache_dir=None, alpha=0.05):
+    """(next month, lower, upper) of the SARIMA one-step forecast; NaNs if the fit fails."""
+    import warnings
+    import model_store
+
+    next_date = ts.index[-1] + pd.offsets.MonthBegin(1)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            store = model_store.ModelStore(cache_dir or model_store.DEFAULT_CACHE_DIR)
+            fitted, _ = store.fit(route_key, ts)
+            lower, upper = np.asarray(fitted.get_forecast(steps=1).conf_int(alpha=alpha))[0]
+    except Exception:
+        return next_date, np.nan, np.nan
+    return next_date, float(lower), float(upper)
+
+
+def detect(outputs_dir="Outputs", rows=None, state_path=None, sarima=False, **detector_kwargs):
+    """
+    Score newly arrived months against the saved state and save the new state.
+
+    rows defaults to the cleaned-store months after the state's last month.
+    With no saved state, every month but the last builds the state and only
+    the last month is scored. Flagged rows are appended to
+    Outputs/evaluations/anomalies.csv and returned. With sarima=True the
+    next-month SARIMA intervals are refreshed afterwards.
+    """
+    import store
+
+    cleaned_path = os.path.join(outputs_dir, "clean", "cleaned_data")
+    state_path = state_path or os.path.join(outputs_dir, "models", "anomaly_state.parquet")
+    detector = AnomalyDetector.load(state_path, **detector_kwargs)
+    if rows is None:
+        last = detector.last_date()
+        start = None if last is None else last + pd.offsets.MonthBegin(1)
+        rows = store.load_cleaned(cleaned_path, columns=["date"] + ROUTE_KEY + ["passengers_total"], start=start)
+    if detector.state.empty and not rows.empty:
+        latest = rows["date"].max()
+        detector.score(rows[rows["date"] < latest])
+        rows = rows[rows["date"] == latest]
+
+    scored = detector.score(rows)
+    flagged = scored[scored["flag"].astype(bool)]
+    if sarima:
+        from route_index import RouteIndex
+
+        history = store.load_cleaned(cleaned_path, columns=["date"] + ROUTE_KEY + ["passengers_total"])
+        detector.refresh_intervals(RouteIndex(history), cache_dir=os.path.join(outputs_dir, "models", "sarima_cache"))
+    detector.save(state_path)
+
+    if not flagged.empty:
+        alerts_path = os.path.join(outputs_dir, "evaluations", "anomalies.csv")
+        os.makedirs(os.path.dirname(alerts_path), exist_ok=True)
+        flagged.to_csv(alerts_path, mode="a", header=not os.path.exists(alerts_path), index=False)
+    return scored, flagged
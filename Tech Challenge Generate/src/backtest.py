@@ -0,0 +1,144 @@
+"""
+Rolling-origin (expanding or sliding window) SARIMA backtests.
+
+Instead of the single train_end/test_end split in run_sarima_backtest, the
+model is evaluated at many forecast origins and horizons. The optimizer only
+runs at the first origin of each block and every `refit_every` origins after
+that; in between, the fitted state is carried forward:
+- expanding window: results.extend(new months) filters only the new months
+- sliding window: the stored params are re-applied to the window (no optimizer)
+
+Origins are split into contiguous blocks of block_size origins (default
+refit_every, so each block has exactly one optimizer run) and the blocks run
+in parallel processes. The blocks do not depend on the number of workers, so
+neither do the results or the number of optimizer runs.
+The result is a tidy table with one row per (origin, horizon).
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import forecast
+import instrument
+from batch_forecast import limit_blas_threads
+
+
+def default_origins(ts, min_train=36, step=1):
+    """Every step-th month from the min_train-th month up to the second-to-last month."""
+    last = len(ts) - 1
+    return list(ts.index[min_train - 1:last:step]) if last >= min_train else []
+
+
+def backtest_block(ts, origins, horizons, window, refit_every, order, seasonal_order):
+    """Run one contiguous block of origins, reusing the fitted state between them."""
+    max_horizon = max(horizons)
+    rows = []
+    fitted = None
+    params = None
+    fitted_end = None
+    since_fit = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for origin in origins:
+            end = ts.index.get_loc(origin) + 1
+            start = 0 if window is None else max(0, end - window)
+            train = ts.iloc[start:end]
+
+            if fitted is None or since_fit >= refit_every:
+                # Optimizer run (warm-started from the previous params after the first one)
+                fitted = forecast.fit_sarima(train, order=order, seasonal_order=seasonal_order, start_params=params)
+                params = fitted.params
+                since_fit = 0
+            elif window is None:
+                fitted = fitted.extend(ts.iloc[fitted_end:end])
+            else:
+                fitted = forecast.filter_sarima(train, params, order=order, seasonal_order=seasonal_order)
+            fitted_end = end
+            since_fit += 1
+
+            preds = np.asarray(fitted.forecast(steps=max_horizon))
+            for horizon in horizons:
+                pos = end - 1 + horizon
+                if pos >= len(ts):
+                    break
+                rows.append({
+                    "origin": origin,
+                    "horizon": horizon,
+                    "date": ts.index[pos],
+                    "y_true": float(ts.iloc[pos]),
+                    "y_pred": float(preds[horizon - 1]),
+                })
+    return rows
+
+
+def rolling_origin_backtest(ts, origins=None, horizons=range(1, 7), min_train=36, step=1, window=None,
+                            refit_every=12, block_size=None, workers=None, order=(1, 1, 1),
+                            seasonal_order=(1, 1, 1, 12)):
+    """
+    Evaluate SARIMA on ts at many origins.
+
+    Parameters:
+    - ts: Monthly series (e.g. from select_route or RouteIndex.series)
+    - origins: Last training month of each fold (default: every step-th month after min_train)
+    - horizons: Months ahead to score
+    - window: None for an expanding window, or the number of months in a sliding window
+    - refit_every: Run the optimizer again after this many origins in a block
+    - block_size: Origins per block; each block starts with a full fit (default: refit_every)
+    - workers: Parallel processes for the blocks (1 = run here)
+
+    Returns a DataFrame with origin, horizon, date, y_true, y_pred, error, abs_error, ape.
+    """
+    horizons = sorted(int(h) for h in horizons)
+    if origins is None:
+        origins = default_origins(ts, min_train=min_train, step=step)
+    origins = [pd.Timestamp(o) for o in origins]
+    if not origins:
+        raise ValueError("No backtest origins; the series is shorter than min_train")
+
+    block_size = block_size or refit_every
+    blocks = [origins[i:i + block_size] for i in range(0, len(origins), block_size)]
+    workers = min(workers or os.cpu_count() or 1, len(blocks))
+    args = (horizons, window, refit_every, order, seasonal_order)
+    if workers == 1:
+        rows = [row for block in blocks for row in backtest_block(ts, block, *args)]
+    else:
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads) as pool:
+            for block_rows in instrument.map_collected(pool, backtest_block, [ts] * len(blocks), blocks,
+                                                       *[[a] * len(blocks) for a in args]):
+                rows.extend(block_rows)
+
+    table = pd.DataFrame(rows, columns=["origin", "horizon", "date", "y_true", "y_pred"])
+    table["error"] = table["y_pred"] - table["y_true"]
+    table["abs_error"] = table["error"].abs()
+    # same MAPE convention as evaluate_forecast (denominator at least 1)
+    table["ape"] = table["abs_error"] / np.maximum(table["y_true"], 1) * 100.0
+    return table
+
+
+def evaluate_by_horizon(table):
+    """MAE, RMSE and MAPE per horizon (evaluate_forecast applied to each horizon's folds)."""
+    rows = []
+    for horizon, group in table.groupby("horizon"):
+        y_true = pd.Series(group["y_true"].to_numpy())
+        y_pred = pd.Series(group["y_pred"].to_numpy())
+        result = forecast.evaluate_forecast(y_true, y_pred)
+        rows.append({"horizon": horizon, "n_origins": len(group),
+                     "mae": result["mae"], "rmse": result["rmse"], "mape": result["mape"]})
+    return pd.DataFrame(rows)
+
+
+def run_rolling_backtest(df, outputs_dir, australian_port, foreign_port, country, label, **kwargs):
+    """Rolling backtest for one route; writes {label}_rolling_backtest.csv and {label}_rolling_metrics.csv."""
+    ts = forecast.select_route(df, australian_port=australian_port, country=country, foreign_port=foreign_port)
+    if ts.empty:
+        raise ValueError(f"No data for route {australian_port} → {foreign_port} ({country})")
+    table = rolling_origin_backtest(ts, **kwargs)
+    summary = evaluate_by_horizon(table)
+
+    os.makedirs(os.path.join(outputs_dir, "models"), exist_ok=True)
+    table.to_csv(os.path.join(outputs_dir, "models", f"{label}_rolling_backtest.csv"), index=False)
+    summary.to_csv(os.path.join(outputs_dir, "models", f"{label}_rolling_metrics.csv"), index=False)
+    return table, summary
@@ -0,0 +1,195 @@
+"""
+Fast forecasting tier: every route of a RouteIndex matrix in one NumPy pass.
+
+Models (all take Y = dates x routes and a presence mask of the same shape):
+- seasonal_naive: repeat the last 12 months
+- seasonal_mean_drift: mean of each calendar month plus the average yearly change
+- fourier_regression: least squares on trend + Fourier seasonality, solved for
+  all routes at once (the LinearRegression idea, batched)
+
+tiered_forecast backtests the three on a holdout, keeps the best per route and
+escalates only routes whose best holdout MAPE is above a threshold to SARIMA.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+SEASON = 12
+
+
+def presence_mask(index):
+    """True where a month is inside the route's first..last observed month."""
+    rows = np.arange(len(index.dates))[:, None]
+    return (rows >= index.first[None, :]) & (rows <= index.last[None, :])
+
+
+def seasonal_naive(Y, mask, horizon):
+    """Repeat the last observed season."""
+    last_season = Y[-SEASON:]
+    reps = int(np.ceil(horizon / SEASON))
+    return np.tile(last_season, (reps, 1))[:horizon]
+
+
+def seasonal_mean_drift(Y, mask, horizon):
+    """Calendar-month means (over observed months) shifted by the average yearly change."""
+    T = Y.shape[0]
+    month_of_row = (np.arange(T) - T) % SEASON  # calendar position relative to the end
+    weights = mask.astype(float)
+    sums = np.zeros((SEASON, Y.shape[1]))
+    counts = np.zeros((SEASON, Y.shape[1]))
+    np.add.at(sums, month_of_row, Y * weights)
+    np.add.at(counts, month_of_row, weights)
+    month_mean = sums / np.maximum(counts, 1)
+
+    # average change between consecutive years, over pairs where both months are observed
+    both = mask[SEASON:] & mask[:-SEASON]
+    yearly_change = ((Y[SEASON:] - Y[:-SEASON]) * both).sum(axis=0) / np.maximum(both.sum(axis=0), 1)
+    years_observed = counts.sum(axis=0) / SEASON
+
+    steps = np.arange(1, horizon + 1)
+    future_month = (steps - 1) % SEASON
+    # the means sit at the middle of the observed years; move them to the forecast year
+    years_ahead = (steps[:, None] + SEASON - 1) // SEASON + (years_observed[None, :] - 1) / 2.0
+    return month_mean[future_month] + yearly_change[None, :] * years_ahead
+
+
+def fourier_design(t, harmonics):
+    """Columns: intercept, trend, then sin/cos pairs for each harmonic of the season."""
+    columns = [np.ones_like(t), t]
+    for k in range(1, harmonics + 1):
+        angle = 2.0 * np.pi * k * t / SEASON
+        columns.extend([np.sin(angle), np.cos(angle)])
+    return np.column_stack(columns)
+
+
+def fourier_regression(Y, mask, horizon, harmonics=3, ridge=1e-6):
+    """Trend + Fourier seasonality fitted per route by weighted least squares, batched."""
+    T = Y.shape[0]
+    t = np.arange(T, dtype=float)
+    scale = max(T, 1)
+    X = fourier_design(t, harmonics)
+    X[:, 1] /= scale  # keep the trend column on the same scale as the others
+    W = mask.astype(float)
+    # Per-route normal equations: (X' W X) b = X' W y, solved for every route at once
+    XtWX = np.einsum("tp,tr,tq->rpq", X, W, X) + ridge * np.eye(X.shape[1])[None]
+    XtWy = np.einsum("tp,tr->rp", X, W * Y)
+    coef = np.linalg.solve(XtWX, XtWy[..., None])[..., 0]
+    Xf = fourier_design(np.arange(T, T + horizon, dtype=float), harmonics)
+    Xf[:, 1] /= scale
+    return Xf @ coef.T
+
+
+MODELS = {
+    "seasonal_naive": seasonal_naive,
+    "seasonal_mean_drift": seasonal_mean_drift,
+    "fourier_regression": fourier_regression,
+}
+
+
+def holdout_predictions(Y, mask, holdout):
+    """Each model's predictions for the last holdout months, fitted on the months before."""
+    train, train_mask = Y[:-holdout], mask[:-holdout]
+    return {name: model(train, train_mask, holdout) for name, model in MODELS.items()}
+
+
+def holdout_mape(Y, mask, holdout, predictions=None):
+    """Holdout MAPE (routes x models) for every model, fitting on all but the last holdout months."""
+    if predictions is None:
+        predictions = holdout_predictions(Y, mask, holdout)
+    actual, actual_mask = Y[-holdout:], mask[-holdout:]
+    scores = {}
+    for name, preds in predictions.items():
+        ape = np.abs(preds - actual) / np.maximum(actual, 1) * 100.0
+        scores[name] = np.where(actual_mask.any(axis=0), (ape * actual_mask).sum(axis=0) / np.maximum(actual_mask.sum(axis=0), 1), np.nan)
+    return pd.DataFrame(scores)
+
+
+def fast_forecast_matrix(Y, mask, horizon=12, holdout=6):
+    """
+    Fast tier on any dates x series matrix.
+
+    Returns (scores, best, preds, holdout_mse): per-model holdout MAPE, the best
+    model name per column, horizon x columns forecasts of the best model and
+    the best model's holdout mean squared error per column.
+    """
+    if Y.shape[0] <= holdout + SEASON:
+        raise ValueError("Not enough months for the fast tier holdout")
+    predictions = holdout_predictions(Y, mask, holdout)
+    scores = holdout_mape(Y, mask, holdout, predictions)
+    best = scores.fillna(np.inf).idxmin(axis=1)
+
+    preds = np.empty((horizon, Y.shape[1]))
+    holdout_mse = np.empty(Y.shape[1])
+    for name, model in MODELS.items():
+        cols = (best == name).to_numpy()
+        if cols.any():
+            preds[:, cols] = model(Y[:, cols], mask[:, cols], horizon)
+            holdout_mse[cols] = ((predictions[name][:, cols] - Y[-holdout:, cols]) ** 2).mean(axis=0)
+    return scores, best, np.maximum(preds, 0.0), holdout_mse
+
+
+def fast_forecast(index, horizon=12, holdout=6):
+    """
+    Forecast every route with the fast tier.
+
+    Returns (metrics, forecasts): metrics has one row per route with each
+    model's holdout MAPE and the best model; forecasts is dates x routes for
+    the best model of each route.
+    """
+    scores, best, preds, _ = fast_forecast_matrix(index.matrix, presence_mask(index), horizon=horizon, holdout=holdout)
+
+    metrics = index.routes.copy()
+    metrics = pd.concat([metrics, scores.add_suffix("_mape")], axis=1)
+    metrics["best_model"] = best.to_numpy()
+    metrics["best_mape"] = scores.min(axis=1, skipna=True).to_numpy()
+    forecasts = pd.DataFrame(preds, index=future_dates(index.dates, horizon), columns=metrics["route"])
+    return metrics, forecasts
+
+
+def future_dates(dates, horizon):
+    """The horizon month-start dates after the last of dates."""
+    return pd.DatetimeIndex(pd.date_range(dates[-1] + pd.offsets.MonthBegin(1), periods=horizon, freq="MS"), name="date")
+
+
+def tiered_forecast(index, outputs_dir, horizon=12, holdout=6, escalate_mape=15.0, workers=None):
+    """
+    Fast tier for every route, SARIMA only where the fast tier is not good enough.
+
+    Routes whose best fast-tier holdout MAPE is above escalate_mape go through
+    batch_forecast.run_batch (same holdout as backtest), and SARIMA is kept
+    only where its holdout MAPE beats the fast tier's. The metrics record
+    whether a route was escalated and which tier won. Writes
+    tiered_metrics.csv and tiered_forecasts.csv to Outputs/models.
+    """
+    metrics, fast = fast_forecast(index, horizon=horizon, holdout=holdout)
+    metrics["model"] = metrics["best_model"]
+    metrics["tier"] = "fast"
+    metrics["sarima_mape"] = np.nan
+    forecasts = fast.reset_index().melt(id_vars="date", var_name="route", value_name="predicted_passengers")
+    forecasts["model"] = forecasts["route"].map(dict(zip(metrics["route"], metrics["best_model"])))
+
+    escalate = metrics["best_mape"] > escalate_mape
+    metrics["escalated"] = escalate
+    if escalate.any():
+        import batch_forecast
+
+        routes = list(metrics.loc[escalate, ["australian_port", "country", "foreign_port"]].itertuples(index=False, name=None))
+        sarima_metrics, sarima_forecasts = batch_forecast.run_batch(
+            index, outputs_dir, routes=routes, train_end=index.dates[-holdout - 1], test_end=index.dates[-1],
+            forecast_months=horizon, forecast_from=index.dates[-1], workers=workers)
+        ok = sarima_metrics[sarima_metrics["status"] == "ok"]
+        metrics["sarima_mape"] = metrics["route"].map(dict(zip(ok["route"], ok["mape"])))
+        # NaN (failed) compares False, so those routes keep the fast tier
+        sarima_wins = metrics["sarima_mape"] < metrics["best_mape"]
+        metrics.loc[sarima_wins, ["model", "tier"]] = ["sarima", "sarima"]
+        winners = set(metrics.loc[sarima_wins, "route"])
+        sarima_forecasts = sarima_forecasts[sarima_forecasts["route"].isin(winners)]
+        sarima_forecasts = sarima_forecasts[["date", "route", "predicted_passengers"]].assign(model="sarima")
+        forecasts = pd.concat([forecasts[~forecasts["route"].isin(winners)], sarima_forecasts], ignore_index=True)
+
+    models_dir = os.path.join(outputs_dir, "models")
+    os.makedirs(models_dir, exist_ok=True)
+    metrics.to_csv(os.path.join(models_dir, "tiered_metrics.csv"), index=False)
+    forecasts.to_csv(os.path.join(models_dir, "tiered_forecasts.csv"), index=False)
+    return metrics, forecasts
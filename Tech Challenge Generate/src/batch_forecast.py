@@ -0,0 +1,194 @@
+"""
+Batch SARIMA backtests and forecasts for many routes across a process pool.
+
+Each route is fitted in its own worker task, so one route that fails or does
+not converge is reported in the metrics table instead of stopping the batch.
+Workers are limited to one BLAS/OpenMP thread each; with N processes that
+keeps the machine at N busy cores instead of N x cores threads.
+
+Outputs (in Outputs/models):
+- batch_sarima_metrics.csv: one row per route (status, error, MAE/RMSE/MAPE,
+  route and fit seconds, optimizer iterations, convergence, memory)
+- batch_sarima_forecasts.csv: one row per route and future month
+
+With cache_dir set, the backtest fit (one cache entry per route and train_end)
+and the forecast fit go through a ModelStore, so an unchanged backtest is a
+cache hit and routes whose history only grew by a few months are extended
+instead of refitted. Entries unused for cache_max_idle_days (and the least
+recently used beyond cache_max_entries) are evicted after each batch. With
+order_cache_path set, each route uses its order from order_search.py.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import forecast
+import instrument
+from model_store import ModelStore
+from route_index import RouteIndex
+
+METRIC_COLUMNS = ["route", "australian_port", "country", "foreign_port", "n_obs", "status", "error",
+                  "warnings", "backtest_fit_action", "fit_action", "order", "mae", "rmse", "mape",
+                  "seconds", "fit_seconds", "fit_iterations", "converged", "rss_delta_mb",
+                  "peak_growth_mb"]
+FORECAST_COLUMNS = ["route", "australian_port", "country", "foreign_port", "date", "predicted_passengers"]
+BLAS_THREAD_VARS = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"]
+
+
+def limit_blas_threads():
+    """Process pool initializer: one BLAS/OpenMP thread per worker."""
+    for var in BLAS_THREAD_VARS:
+        os.environ[var] = "1"
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(1)
+
+
+def active_routes(index, min_total=0):
+    """Route keys (australian_port, country, foreign_port) with total passengers >= min_total."""
+    totals = index.matrix.sum(axis=0)
+    keep = index.routes[totals >= min_total]
+    return list(keep[["australian_port", "country", "foreign_port"]].itertuples(index=False, name=None))
+
+
+def forecast_route(key, ts, train_end, test_end, forecast_months, forecast_from, cache_dir=None, policy=None,
+                   order_cache_path=None):
+    """
+    Backtest and forecast one route; never raises.
+
+    Returns (metrics row, forecast rows). Failures are recorded in the metrics
+    row with status "failed" and the error message.
+    """
+    australian_port, country, foreign_port = key
+    row = {
+        "route": f"{australian_port} → {foreign_port}",
+        "australian_port": australian_port,
+        "country": country,
+        "foreign_port": foreign_port,
+        "n_obs": len(ts),
+        "status": "ok",
+        "error": "",
+        "warnings": 0,
+        "backtest_fit_action": "cold",
+        "fit_action": "cold",
+        "order": "",
+        "mae": float("nan"),
+        "rmse": float("nan"),
+        "mape": float("nan"),
+        "seconds": float("nan"),
+        "fit_seconds": float("nan"),
+        "fit_iterations": float("nan"),
+        "converged": None,
+        "rss_delta_mb": float("nan"),
+        "peak_growth_mb": float("nan"),
+    }
+    forecast_rows = []
+    with instrument.stage("route", route=row["route"]) as record, warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            order, seasonal_order = (1, 1, 1), (1, 1, 1, 12)
+            if order_cache_path is not None:
+                import order_search
+
+                order, seasonal_order = order_search.cached_order(key, order_cache_path)
+            row["order"] = f"{order}{seasonal_order}"
+            if cache_dir is not None:
+                model_store = ModelStore(cache_dir, policy=policy)
+                train, test = forecast.train_test_split_time_series(ts, train_end=train_end, test_end=test_end)
+                # keyed on train_end as well, so it does not share (and thrash) the forecast fit's entry
+                backtest_key = key + ("backtest", str(pd.Timestamp(train_end).date()))
+                fitted_model, row["backtest_fit_action"], fit_record = model_store.fit(
+                    backtest_key, train, order=order, seasonal_order=seasonal_order, return_record=True)
+                result = forecast.evaluate_fitted(fitted_model, test)
+                result["fit"] = instrument.fit_summary(fit_record)
+            else:
+                result = forecast.backtest_series(ts, train_end=train_end, test_end=test_end,
+                                                  order=order, seasonal_order=seasonal_order)
+            row.update(mae=result["mae"], rmse=result["rmse"], mape=result["mape"],
+                       fit_seconds=result["fit"].get("wall_s"), fit_iterations=result["fit"].get("iterations"),
+                       converged=result["fit"].get("converged"))
+            origin = forecast_from if forecast_from is not None else ts.index.max()
+            if cache_dir is not None:
+                fitted_model, row["fit_action"] = model_store.fit(key, ts[:origin], order=order, seasonal_order=seasonal_order)
+                future = forecast.dated_forecast(fitted_model, origin, forecast_months)
+            else:
+                future = forecast.forecast_series(ts, train_end=origin, forecast_months=forecast_months,
+                                                  order=order, seasonal_order=seasonal_order)
+            forecast_rows = [
+                {"route": row["route"], "australian_port": australian_port, "country": country,
+                 "foreign_port": foreign_port, "date": date, "predicted_passengers": float(value)}
+                for date, value in future.items()
+            ]
+        except Exception as exc:  # one bad route must not stop the batch
+            row.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            record["status"] = "failed"
+        record["warnings"] = len(caught)
+    row.update(warnings=len(caught), seconds=record["wall_s"],
+               **{field: record[field] for field in instrument.MEMORY_FIELDS})
+    return row, forecast_rows
+
+
+def run_batch(df, outputs_dir, routes=None, min_total=0, train_end="1988-12-01", test_end="1989-06-01",
+              forecast_months=12, forecast_from=None, workers=None, cache_dir=None, policy=None,
+              order_cache_path=None, cache_max_idle_days=180, cache_max_entries=None):
+    """
+    Backtest and forecast many routes in parallel and write consolidated tables.
+
+    Parameters:
+    - df: Cleaned DataFrame or RouteIndex
+    - routes: List of (australian_port, country, foreign_port); default is every
+      route with total passengers >= min_total
+    - train_end, test_end: Backtest split (same meaning as run_sarima_backtest)
+    - forecast_months: Months to forecast after forecast_from
+    - forecast_from: Last training month for the forecast (default: each route's last month)
+    - workers: Number of processes (default: os.cpu_count())
+    - cache_dir, policy: Reuse fitted params from a ModelStore (see model_store.py)
+    - cache_max_idle_days, cache_max_entries: Eviction limits for cache_dir
+    - order_cache_path: Use per-route orders chosen by order_search.py
+    """
+    index = df if isinstance(df, RouteIndex) else RouteIndex(df)
+    if routes is None:
+        routes = active_routes(index, min_total=min_total)
+
+    tasks = [(key, index.series(*key)) for key in routes]
+    metrics, forecasts = [], []
+    if workers == 1:
+        for key, ts in tasks:
+            row, rows = forecast_route(key, ts, train_end, test_end, forecast_months, forecast_from, cache_dir, policy,
+                                       order_cache_path)
+            metrics.append(row)
+            forecasts.extend(rows)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads) as pool:
+            futures = [
+                pool.submit(instrument.call_collected, forecast_route, key, ts, train_end, test_end, forecast_months,
+                            forecast_from, cache_dir, policy, order_cache_path)
+                for key, ts in tasks
+            ]
+            for future in futures:
+                try:
+                    (row, rows), records = future.result()
+                except Exception as exc:
+                    instrument.RECORDER.merge(getattr(exc, "instrument_records", ()))
+                    raise
+                # the route and SARIMAX records were made in the worker; keep them for --metrics-out
+                instrument.RECORDER.merge(records)
+                metrics.append(row)
+                forecasts.extend(rows)
+
+    metrics_df = pd.DataFrame(metrics, columns=METRIC_COLUMNS)
+    forecasts_df = pd.DataFrame(forecasts, columns=FORECAST_COLUMNS)
+
+    models_dir = os.path.join(outputs_dir, "models")
+    os.makedirs(models_dir, exist_ok=True)
+    metrics_df.to_csv(os.path.join(models_dir, "batch_sarima_metrics.csv"), index=False)
+    forecasts_df.to_csv(os.path.join(models_dir, "batch_sarima_forecasts.csv"), index=False)
+
+    if cache_dir is not None:
+        removed = ModelStore(cache_dir).evict(max_idle_days=cache_max_idle_days, max_entries=cache_max_entries)
+        if removed:
+            print(f"Evicted {removed} cached models from {cache_dir}")
+    return metrics_df, forecasts_df
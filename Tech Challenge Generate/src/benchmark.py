@@ -0,0 +1,250 @@
+"""
+Benchmarks for the main stages on synthetic data at several scales.
+
+For each scale a synthetic CSV is generated (synthetic.py) and every stage is
+run once under tracemalloc for its peak Python memory, then `repeat` times
+untraced for its best wall time. Results go to
+Outputs/benchmarks/benchmark_<timestamp>.json and can be compared with a saved
+baseline; a stage regresses when it is slower or uses more memory than the
+baseline by more than the tolerance.
+"""
+
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+SCALES = {
+    "small": {"n_routes": 30, "n_months": 60},
+    "medium": {"n_routes": 300, "n_months": 240},
+    "large": {"n_routes": 2000, "n_months": 360},
+}
+
+
+def bench_clean_and_enrich(ctx):
+    import data_prep
+
+    data_prep.clean_and_enrich(ctx["csv_path"], ctx["outputs_dir"])
+
+
+def bench_add_z_scores(ctx):
+    import data_prep
+
+    data_prep.add_z_scores(ctx["enriched"])
+
+
+def bench_load_cleaned(ctx):
+    import store
+
+    store.load_cleaned(os.path.join(ctx["outputs_dir"], "clean", "cleaned_data"))
+
+
+def bench_select_route(ctx):
+    import forecast
+
+    forecast.select_route(ctx["enriched"], *ctx["route"])
+
+
+def bench_route_index(ctx):
+    from route_index import RouteIndex
+
+    RouteIndex(ctx["enriched"])
+
+
+def bench_fit_sarima(ctx):
+    import warnings
+    import forecast
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        forecast.fit_sarima(ctx["index"].series(*ctx["route"]))
+
+
+def bench_fast_forecast(ctx):
+    import baselines
+
+    baselines.fast_forecast(ctx["index"])
+
+
+def bench_plot_time_series(ctx):
+    import visualize
+
+    visualize.plot_time_series(ctx["enriched"], ctx["outputs_dir"])
+
+
+def bench_plot_seasonality(ctx):
+    import visualize
+
+    visualize.plot_seasonality(ctx["enriched"], ctx["outputs_dir"], ctx["route_name"])
+
+
+def bench_dashboard_filter(ctx):
+    # the dashboard's filter step, uncached (query() would return the memoized result)
+    ctx["cube"].compute("passengers_total", ctx["year_range"], (3, 9), (ctx["route"][0],), (), (), ())
+
+
+def bench_anomaly_score(ctx):
+    import anomaly
+
+    anomaly.AnomalyDetector().score(ctx["enriched"])
+
+
+STAGES = {
+    "clean_and_enrich": bench_clean_and_enrich,
+    "load_cleaned": bench_load_cleaned,
+    "add_z_scores": bench_add_z_scores,
+    "select_route": bench_select_route,
+    "route_index": bench_route_index,
+    "fit_sarima": bench_fit_sarima,
+    "fast_forecast": bench_fast_forecast,
+    "plot_time_series": bench_plot_time_series,
+    "plot_seasonality": bench_plot_seasonality,
+    "dashboard_filter": bench_dashboard_filter,
+    "anomaly_score": bench_anomaly_score,
+}
+
+
+def prepare(work_dir, scale, seed=0):
+    """Write the synthetic CSV for a scale and build the inputs the stages share (not timed)."""
+    import cube
+    import data_prep
+    import synthetic
+    from route_index import RouteIndex
+
+    csv_path = os.path.join(work_dir, "raw.csv")
+    raw = synthetic.write_csv(csv_path, seed=seed, **SCALES[scale])
+    outputs_dir = os.path.join(work_dir, "Outputs")
+    data_prep.ensure_output_dirs(outputs_dir)
+    enriched, _ = data_prep.clean_and_enrich(csv_path, outputs_dir)
+    index = RouteIndex(enriched)
+    busiest = int(np.argmax(index.matrix.sum(axis=0)))
+    route = tuple(index.routes.loc[busiest, ["australian_port", "country", "foreign_port"]])
+    years = enriched["year"]
+    return {
+        "csv_path": csv_path,
+        "outputs_dir": outputs_dir,
+        "rows": len(raw),
+        "enriched": enriched,
+        "index": index,
+        "route": route,
+        "route_name": index.routes.loc[busiest, "route"],
+        "cube": cube.RouteCube(enriched),
+        "year_range": (int(years.min()), int(years.max())),
+    }
+
+
+def measure(func, ctx, repeat=3):
+    """(best wall seconds over repeat runs, peak traced memory in MB of one run)."""
+    tracemalloc.start()
+    func(ctx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ctx)
+        times.append(time.perf_counter() - start)
+    return min(times), peak / 2**20
+
+
+def run_benchmarks(scales=("small", "medium"), stages=None, repeat=3, seed=0):
+    """
+    Run the stages at each scale.
+
+    Returns a dict with meta (versions, platform, time) and results (one
+    entry per scale and stage: rows, seconds, peak_mb).
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    stages = list(stages or STAGES)
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages {unknown}; choose from {list(STAGES)}")
+    results = []
+    for scale in scales:
+        work_dir = tempfile.mkdtemp(prefix=f"aeroconnect_bench_{scale}_")
+        try:
+            ctx = prepare(work_dir, scale, seed=seed)
+            for name in stages:
+                seconds, peak_mb = measure(STAGES[name], ctx, repeat=repeat)
+                results.append({"scale": scale, "stage": name, "rows": ctx["rows"],
+                                "seconds": round(seconds, 6), "peak_mb": round(peak_mb, 3)})
+                print(f"{scale:>6} {name:<18} {seconds:9.4f}s {peak_mb:9.1f} MB")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": repeat,
+            "scales": {scale: SCALES[scale] for scale in scales},
+        },
+        "results": results,
+    }
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.005, min_mb=1.0):
+    """
+    Stage-by-stage comparison with a baseline run.
+
+    A stage regresses when its time (or peak memory) exceeds the baseline by
+    more than tolerance (0.25 = 25%) and by more than min_seconds (min_mb),
+    so that tiny stages do not flag on timer noise. Returns a DataFrame with
+    one row per (scale, stage) found in both runs.
+    """
+    current = pd.DataFrame(results["results"])
+    base = pd.DataFrame(baseline["results"])
+    merged = current.merge(base, on=["scale", "stage"], suffixes=("", "_baseline"))
+    merged["time_ratio"] = merged["seconds"] / merged["seconds_baseline"].where(merged["seconds_baseline"] > 0)
+    merged["memory_ratio"] = merged["peak_mb"] / merged["peak_mb_baseline"].where(merged["peak_mb_baseline"] > 0)
+    slower = ((merged["seconds"] > merged["seconds_baseline"] * (1 + tolerance))
+              & (merged["seconds"] - merged["seconds_baseline"] > min_seconds))
+    bigger = ((merged["peak_mb"] > merged["peak_mb_baseline"] * (1 + tolerance))
+              & (merged["peak_mb"] - merged["peak_mb_baseline"] > min_mb))
+    merged["regression"] = np.select([slower & bigger, slower, bigger], ["time+memory", "time", "memory"], "")
+    return merged[["scale", "stage", "seconds_baseline", "seconds", "time_ratio",
+                   "peak_mb_baseline", "peak_mb", "memory_ratio", "regression"]]
+
+
+def main(outputs_dir="Outputs", scales=("small", "medium"), stages=None, repeat=3, baseline_path=None,
+         save_baseline=False, tolerance=0.25):
+    """Run, write the results JSON and compare with the baseline (if there is one); returns the comparison."""
+    results = run_benchmarks(scales=scales, stages=stages, repeat=repeat)
+    bench_dir = os.path.join(outputs_dir, "benchmarks")
+    path = save_results(results, os.path.join(bench_dir, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    print(f"Wrote {path}")
+
+    baseline_path = baseline_path or os.path.join(bench_dir, "baseline.json")
+    if save_baseline:
+        save_results(results, baseline_path)
+        print(f"Saved baseline {baseline_path}")
+        return None
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; rerun with --save-baseline to create one")
+        return None
+    return compare(results, load_results(baseline_path), tolerance=tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Command line entry point for the whole project.
+
+Usage (run from this folder):
+    python cli.py clean --input TechChallenge_Data.csv
+    python cli.py forecast
+    python cli.py plot
+    python cli.py pipeline --input TechChallenge_Data.csv
+    python cli.py detect
+    python cli.py dashboard --port 5006
+    python cli.py serve --port 8000
+    python cli.py --metrics-out Outputs/metrics/run.json --profile forecast
+
+Only argparse is imported up front. Each command imports its own module (and
+with it pandas, statsmodels, matplotlib or panel) when it runs, so `--help`
+and cleaning-only runs do not pay for the heavy libraries.
+"""
+
+import argparse
+import os
+import sys
+
+
+def run_clean(args):
+    import data_prep
+
+    if args.append:
+        df, cleaned_path = data_prep.append_months(args.input, args.outputs, restate=args.restate)
+        print(f"Appended {len(df)} rows to {cleaned_path}")
+    elif args.streaming:
+        cleaned_path, stats = data_prep.clean_and_enrich_streaming(args.input, args.outputs, chunksize=args.chunksize)
+        print(f"Wrote {cleaned_path} ({int(stats['count'].sum())} rows, {len(stats)} routes)")
+    else:
+        df, cleaned_path = data_prep.clean_and_enrich(args.input, args.outputs, extra_features=args.features)
+        print(f"Wrote {cleaned_path} ({len(df)} rows)")
+
+
+def run_forecast(args):
+    if args.tiered:
+        import baselines
+        import store
+        from route_index import RouteIndex
+
+        df = store.load_cleaned(os.path.join(args.outputs, "clean", "cleaned_data"), columns=[
+            "date", "australian_port", "foreign_port", "country", "continent", "passengers_total"])
+        metrics, _ = baselines.tiered_forecast(RouteIndex(df), args.outputs, horizon=args.months,
+                                               escalate_mape=args.escalate_mape, workers=args.workers)
+        print(metrics["model"].value_counts().to_string())
+        return
+
+    if args.batch:
+        import batch_forecast
+        import store
+
+        df = store.load_cleaned(os.path.join(args.outputs, "clean", "cleaned_data"), columns=[
+            "date", "australian_port", "foreign_port", "country", "continent", "passengers_total"])
+        metrics, _ = batch_forecast.run_batch(
+            df, args.outputs, min_total=args.min_total, train_end=args.train_end, test_end=args.test_end,
+            forecast_months=args.months, workers=args.workers,
+            cache_dir=os.path.join(args.outputs, "models", "sarima_cache") if args.cache else None,
+            order_cache_path=os.path.join(args.outputs, "models", "order_cache.json") if args.tuned_orders else None,
+            cache_max_idle_days=args.cache_max_idle_days, cache_max_entries=args.cache_max_entries)
+        print(metrics["status"].value_counts().to_string())
+        return
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import forecast
+
+    forecast.main(outputs_dir=args.outputs)
+
+
+def run_backtest(args):
+    import backtest
+    import store
+    from route_index import RouteIndex
+
+    df = store.load_cleaned(os.path.join(args.outputs, "clean", "cleaned_data"), columns=[
+        "date", "australian_port", "foreign_port", "country", "passengers_total"],
+        australian_ports=[args.port])
+    label = args.label or f"{args.port}_{args.foreign_port}".lower().replace(" ", "_")
+    _, summary = backtest.run_rolling_backtest(
+        RouteIndex(df), args.outputs, australian_port=args.port, foreign_port=args.foreign_port,
+        country=args.country, label=label, horizons=range(1, args.horizons + 1), min_train=args.min_train,
+        window=args.window, refit_every=args.refit_every, block_size=args.block_size, workers=args.workers)
+    print(summary.to_string(index=False))
+
+
+def run_select_orders(args):
+    import batch_forecast
+    import order_search
+    import store
+    from route_index import RouteIndex
+
+    df = store.load_cleaned(os.path.join(args.outputs, "clean", "cleaned_data"), columns=[
+        "date", "australian_port", "foreign_port", "country", "passengers_total"])
+    index = RouteIndex(df)
+    cache_path = os.path.join(args.outputs, "models", "order_cache.json")
+    series = ((key, index.series(*key)) for key in batch_forecast.active_routes(index, min_total=args.min_total))
+    for key, spec, from_cache in order_search.select_orders(
+            series, cache_path=cache_path, max_age_days=args.max_age_days, force=args.force,
+            criterion=args.criterion, workers=args.workers):
+        print(f"{' | '.join(key)}: {spec[0]}{spec[1]}" + (" (cached)" if from_cache else ""))
+
+
+def run_hierarchy(args):
+    import hierarchy
+    import store
+    from route_index import RouteIndex
+
+    df = store.load_cleaned(os.path.join(args.outputs, "clean", "cleaned_data"), columns=[
+        "date", "australian_port", "foreign_port", "country", "continent", "passengers_total"])
+    result = hierarchy.hierarchical_forecast(RouteIndex(df), args.outputs, method=args.method, horizon=args.months)
+    first = result[result["date"] == result["date"].min()]
+    print(first[first["level"] != "route"].to_string(index=False))
+
+
+def run_pipeline(args):
+    import pipeline
+
+    status = pipeline.main(args.input, args.outputs, extra_features=args.features,
+                           force=True if args.force == [] or "all" in (args.force or ()) else (args.force or ()),
+                           dry_run=args.dry_run, workers=args.workers)
+    for name, state in status.items():
+        print(f"{name}: {state}")
+    if any(state in ("failed", "blocked") for state in status.values()):
+        raise SystemExit(1)
+
+
+def run_detect(args):
+    import anomaly
+
+    scored, flagged = anomaly.detect(args.outputs, sarima=args.sarima, threshold=args.threshold)
+    print(f"Scored {len(scored)} route-months, {len(flagged)} flagged")
+    if not flagged.empty:
+        print(flagged[["date", "route", "country", "passengers_total", "expected", "z", "reason"]].to_string(index=False))
+
+
+def run_benchmark(args):
+    import benchmark
+
+    comparison = benchmark.main(args.outputs, scales=args.scales, stages=args.stages, repeat=args.repeat,
+                                baseline_path=args.baseline, save_baseline=args.save_baseline,
+                                tolerance=args.tolerance)
+    if comparison is not None:
+        print(comparison.to_string(index=False))
+        if (comparison["regression"] != "").any():
+            raise SystemExit(1)
+
+
+def run_plot(args):
+    import matplotlib
+    matplotlib.use("Agg")
+    import visualize
+
+    visualize.main(outputs_dir=args.outputs, all_routes=args.all_routes, routes=args.routes,
+                   workers=args.workers, force=args.force)
+
+
+def run_dashboard(args):
+    import dashboard
+
+    dashboard.serve(os.path.join(args.outputs, "clean", "cleaned_data"), port=args.port, show=not args.no_show,
+                    num_procs=args.num_procs)
+
+
+def run_serve(args):
+    import asyncio
+    import serve
+    import store
+    from route_index import RouteIndex
+
+    df = store.load_cleaned(os.path.join(args.outputs, "clean", "cleaned_data"), columns=[
+        "date", "australian_port", "foreign_port", "country", "passengers_total"])
+    service = serve.ForecastService(RouteIndex(df), workers=args.workers, cache_size=args.cache_size, ttl=args.ttl)
+    print(f"Serving forecasts on http://{args.host}:{args.port}/forecast")
+    try:
+        asyncio.run(serve.serve_http(service, host=args.host, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="aeroconnect", description="AeroConnect route analysis and forecasting")
+    parser.add_argument("--outputs", default="Outputs", help="Outputs folder (default: Outputs)")
+    parser.add_argument("--metrics-out", default=None,
+                        help="Write stage timings/memory/fit info as JSON here (and Prometheus text next to it as .prom)")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile the whole command into Outputs/profiles (AEROCONNECT_PROFILE=stage,... profiles single stages)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    clean = commands.add_parser("clean", help="Clean the raw CSV into the cleaned-data store")
+    clean.add_argument("--input", default="TechChallenge_Data.csv", help="Raw BITRE-style CSV")
+    clean.add_argument("--features", nargs="*", default=None, help="Extra feature columns from features.FEATURES (not with --streaming)")
+    clean.add_argument("--streaming", action="store_true", help="Read the raw CSV in chunks (bounded memory)")
+    clean.add_argument("--chunksize", type=int, default=250_000, help="Rows per chunk with --streaming")
+    clean.add_argument("--append", action="store_true", help="Append new months to the existing store")
+    clean.add_argument("--restate", action="store_true", help="With --append, rewrite older z-scores too")
+    clean.set_defaults(func=run_clean)
+
+    forecast = commands.add_parser("forecast", help="Run the SARIMA backtest and forecast")
+    forecast.add_argument("--batch", action="store_true", help="All routes in a process pool (batch_forecast.py)")
+    forecast.add_argument("--min-total", type=float, default=0, help="With --batch, skip routes below this many passengers")
+    forecast.add_argument("--workers", type=int, default=None, help="With --batch, number of processes")
+    forecast.add_argument("--tiered", action="store_true", help="Fast NumPy tier for all routes, SARIMA only above --escalate-mape")
+    forecast.add_argument("--escalate-mape", type=float, default=15.0, help="With --tiered, holdout MAPE that triggers SARIMA")
+    forecast.add_argument("--cache", action="store_true", help="With --batch, reuse fitted params (model_store.py)")
+    forecast.add_argument("--cache-max-idle-days", type=float, default=180,
+                          help="With --cache, evict cached models unused for this many days")
+    forecast.add_argument("--cache-max-entries", type=int, default=None,
+                          help="With --cache, keep at most this many cached models (least recently used go first)")
+    forecast.add_argument("--tuned-orders", action="store_true", help="With --batch, use orders from select-orders")
+    forecast.add_argument("--train-end", default="1988-12-01")
+    forecast.add_argument("--test-end", default="1989-06-01")
+    forecast.add_argument("--months", type=int, default=12, help="Months to forecast")
+    forecast.set_defaults(func=run_forecast)
+
+    rolling = commands.add_parser("backtest", help="Rolling-origin backtest for one route (backtest.py)")
+    rolling.add_argument("--port", required=True, help="Australian port, e.g. Perth")
+    rolling.add_argument("--country", required=True, help="Country, e.g. Singapore")
+    rolling.add_argument("--foreign-port", required=True, help="Foreign port, e.g. Singapore")
+    rolling.add_argument("--label", default=None, help="Output file prefix")
+    rolling.add_argument("--horizons", type=int, default=6, help="Score horizons 1..N")
+    rolling.add_argument("--min-train", type=int, default=36, help="Months before the first origin")
+    rolling.add_argument("--window", type=int, default=None, help="Sliding window length (default: expanding)")
+    rolling.add_argument("--refit-every", type=int, default=12, help="Origins between optimizer runs")
+    rolling.add_argument("--block-size", type=int, default=None,
+                         help="Origins per parallel block, each starting with a full fit (default: --refit-every)")
+    rolling.add_argument("--workers", type=int, default=None)
+    rolling.set_defaults(func=run_backtest)
+
+    orders = commands.add_parser("select-orders", help="Stepwise SARIMA order search per route (order_search.py)")
+    orders.add_argument("--min-total", type=float, default=0, help="Skip routes below this many passengers")
+    orders.add_argument("--criterion", choices=["aic", "backtest"], default="aic")
+    orders.add_argument("--max-age-days", type=float, default=90, help="Reuse cached orders younger than this")
+    orders.add_argument("--force", action="store_true", help="Search again even if a cached order exists")
+    orders.add_argument("--workers", type=int, default=None)
+    orders.set_defaults(func=run_select_orders)
+
+    tree = commands.add_parser("hierarchy", help="Coherent route/port/country/continent forecasts (hierarchy.py)")
+    tree.add_argument("--method", default="mint_diag", choices=["bottom_up", "ols", "wls_struct", "mint_diag"])
+    tree.add_argument("--months", type=int, default=12, help="Months to forecast")
+    tree.set_defaults(func=run_hierarchy)
+
+    flow = commands.add_parser("pipeline", help="clean -> forecast + plot, skipping up-to-date stages (pipeline.py)")
+    flow.add_argument("--input", default="TechChallenge_Data.csv", help="Raw BITRE-style CSV")
+    flow.add_argument("--features", nargs="*", default=None, help="Extra feature columns from features.FEATURES")
+    flow.add_argument("--force", nargs="*", default=None, help="Stages to rerun anyway (no names or \"all\" for every stage)")
+    flow.add_argument("--dry-run", action="store_true", help="Only show which stages would run")
+    flow.add_argument("--workers", type=int, default=None, help="Processes for stages that can run together")
+    flow.set_defaults(func=run_pipeline)
+
+    detect = commands.add_parser("detect", help="Flag routes whose newest months deviate (anomaly.py)")
+    detect.add_argument("--threshold", type=float, default=3.0, help="Flag above this many EWMA standard deviations")
+    detect.add_argument("--sarima", action="store_true", help="Also refresh next-month SARIMA prediction intervals")
+    detect.set_defaults(func=run_detect)
+
+    bench = commands.add_parser("benchmark", help="Time and memory-profile stages on synthetic data (benchmark.py)")
+    bench.add_argument("--scales", nargs="*", default=["small", "medium"], choices=["small", "medium", "large"])
+    bench.add_argument("--stages", nargs="*", default=None, help="Stages to run (default: all in benchmark.STAGES)")
+    bench.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    bench.add_argument("--baseline", default=None, help="Baseline JSON (default: Outputs/benchmarks/baseline.json)")
+    bench.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    bench.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown/memory growth (0.25 = 25%%)")
+    bench.set_defaults(func=run_benchmark)
+
+    plot = commands.add_parser("plot", help="Render the static figures")
+    plot.add_argument("--all-routes", action="store_true", help="Also draw seasonality and time series for every route")
+    plot.add_argument("--routes", nargs="*", default=None, help="Draw route figures only for these route names")
+    plot.add_argument("--workers", type=int, default=None, help="Processes for route figures")
+    plot.add_argument("--force", action="store_true", help="Redraw route figures even if their data is unchanged")
+    plot.set_defaults(func=run_plot)
+
+    dashboard = commands.add_parser("dashboard", help="Serve the Panel dashboard")
+    dashboard.add_argument("--port", type=int, default=5006)
+    dashboard.add_argument("--no-show", action="store_true", help="Do not open a browser")
+    dashboard.add_argument("--num-procs", type=int, default=1, help="Server processes sharing one memory-mapped snapshot")
+    dashboard.set_defaults(func=run_dashboard)
+
+    api = commands.add_parser("serve", help="Local HTTP/JSON forecast API (serve.py)")
+    api.add_argument("--host", default="127.0.0.1")
+    api.add_argument("--port", type=int, default=8000)
+    api.add_argument("--workers", type=int, default=2, help="Processes for SARIMA fits")
+    api.add_argument("--cache-size", type=int, default=256, help="Forecasts and fitted models kept in memory")
+    api.add_argument("--ttl", type=float, default=3600, help="Seconds before a cached forecast expires")
+    api.set_defaults(func=run_serve)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "clean" and args.streaming and args.features:
+        # the features look across a route's months, which one chunk does not hold
+        parser.error("--features cannot be combined with --streaming; run clean without --streaming")
+    import instrument
+
+    # set in the environment so that worker processes write their profiles to the same place
+    os.environ.setdefault(instrument.PROFILE_DIR_ENV, os.path.join(args.outputs, "profiles"))
+    if args.metrics_out is None and not args.profile:
+        args.func(args)
+        return 0
+    try:
+        with instrument.stage(args.command, profile=args.profile):
+            args.func(args)
+    finally:
+        if args.metrics_out:
+            instrument.RECORDER.to_json(args.metrics_out)
+            instrument.RECORDER.to_prometheus(os.path.splitext(args.metrics_out)[0] + ".prom")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
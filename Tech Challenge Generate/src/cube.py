@@ -0,0 +1,146 @@
+"""
+Pre-aggregated date x route cube for the dashboard.
+
+The cleaned frame is summed once into cells (date, australian_port,
+foreign_port, country, continent) with every dimension stored as an integer
+code. A filter state then becomes a handful of boolean lookup tables indexed
+by those codes, and both dashboard views are answered from one np.bincount
+pass over the selected cells. Results are memoized on the filter state, so
+changing only Top N / Bottom N or re-rendering a view costs nothing.
+
+to_arrow()/from_arrow() store the cube as an Arrow table of those integer
+codes and metric values (the levels go in the schema metadata), so a cube can
+be rebuilt from a memory-mapped file without copying its arrays.
+"""
+
+import json
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+METRICS = ["passengers_total", "passengers_total_z", "freight_total_tonnes", "mail_total_tonnes", "load_balance_ratio"]
+DIMENSIONS = ["australian_port", "foreign_port", "country", "continent"]
+CUBE_COLUMNS = ["date", "route"] + DIMENSIONS + METRICS
+
+CubeResult = namedtuple("CubeResult", ["time_series", "route_totals"])
+
+
+class RouteCube:
+    """
+    Dashboard cube built once per dataset.
+
+    Parameters:
+    - df: Cleaned data (at least CUBE_COLUMNS; missing metrics are skipped)
+    - cache_size: Filter states kept by the memoized query
+    """
+
+    def __init__(self, df, cache_size=256):
+        self.metrics = [m for m in METRICS if m in df.columns]
+        keys = ["date", "route"] + DIMENSIONS
+        cells = (df[keys + self.metrics]
+                 .groupby(keys, observed=True, sort=True)[self.metrics].sum()
+                 .reset_index())
+
+        date_codes, dates = pd.factorize(cells["date"], sort=True)
+        codes, levels = {}, {}
+        for dim in ["route"] + DIMENSIONS:
+            dim_codes, dim_levels = pd.factorize(cells[dim].astype(str), sort=True)
+            codes[dim] = dim_codes.astype(np.int32)
+            levels[dim] = dim_levels
+        # NaN-free so that bincount sums behave like pandas' skipna sums
+        values = {m: np.nan_to_num(cells[m].to_numpy(dtype=float)) for m in self.metrics}
+        self.setup(dates, date_codes.astype(np.int32), codes, levels, values, cache_size)
+
+    def setup(self, dates, date_code, codes, levels, values, cache_size):
+        self.dates = pd.DatetimeIndex(dates)
+        self.date_code = date_code
+        self.years = self.dates.year.to_numpy()
+        self.months = self.dates.month.to_numpy()
+        self.codes = codes
+        self.levels = {dim: pd.Index(level) for dim, level in levels.items()}
+        self.values = values
+        self.metrics = list(values)
+        self.query = lru_cache(maxsize=cache_size)(self.compute)
+
+    def to_arrow(self):
+        """The cube's cells as a pyarrow Table (codes and metric values; levels in the metadata)."""
+        import pyarrow as pa
+
+        arrays = {"date_code": self.date_code}
+        arrays.update({f"{dim}_code": codes for dim, codes in self.codes.items()})
+        arrays.update(self.values)
+        levels = {dim: list(level) for dim, level in self.levels.items()}
+        levels["date"] = [str(date.date()) for date in self.dates]
+        return pa.table(arrays).replace_schema_metadata({"levels": json.dumps(levels)})
+
+    @classmethod
+    def from_arrow(cls, table, cache_size=256):
+        """
+        Cube from a to_arrow() table. The arrays are zero-copy, read-only views
+        of the table's buffers, so a memory-mapped table is never copied.
+        """
+        levels = json.loads(table.schema.metadata[b"levels"])
+        table = table.combine_chunks()
+
+        def column(name):
+            return table.column(name).chunk(0).to_numpy(zero_copy_only=True)
+
+        cube = cls.__new__(cls)
+        dims = ["route"] + DIMENSIONS
+        metrics = [m for m in METRICS if m in table.column_names]
+        cube.setup(pd.to_datetime(levels["date"]), column("date_code"),
+                   {dim: column(f"{dim}_code") for dim in dims}, {dim: levels[dim] for dim in dims},
+                   {m: column(m) for m in metrics}, cache_size)
+        return cube
+
+    def options(self, dim):
+        """Sorted values of a dimension, for the widgets."""
+        return list(self.levels[dim])
+
+    def year_bounds(self):
+        return int(self.years.min()), int(self.years.max())
+
+    def cell_mask(self, year_range, month_range, selections):
+        """Boolean mask over cells for a filter state, built from code lookup tables."""
+        date_ok = ((self.years >= year_range[0]) & (self.years <= year_range[1])
+                   & (self.months >= month_range[0]) & (self.months <= month_range[1]))
+        mask = date_ok[self.date_code]
+        for dim, values in selections.items():
+            if not values:
+                continue
+            allowed = np.zeros(len(self.levels[dim]), dtype=bool)
+            positions = self.levels[dim].get_indexer(list(values))
+            allowed[positions[positions >= 0]] = True
+            mask &= allowed[self.codes[dim]]
+        return mask
+
+    def compute(self, metric, year_range, month_range, ports=(), foreign_ports=(), continents=(), countries=()):
+        """
+        Time series (sum per date) and route totals (sum per route, descending)
+        for one filter state. Use query(...) for the memoized version; its
+        arguments must be hashable (see filter_state).
+        """
+        selections = {"australian_port": ports, "foreign_port": foreign_ports,
+                      "continent": continents, "country": countries}
+        mask = self.cell_mask(year_range, month_range, selections)
+        weights = self.values[metric][mask]
+
+        date_code = self.date_code[mask]
+        by_date = np.bincount(date_code, weights=weights, minlength=len(self.dates))
+        date_seen = np.bincount(date_code, minlength=len(self.dates)) > 0
+        time_series = pd.Series(by_date[date_seen], index=self.dates[date_seen], name=metric)
+
+        route_code = self.codes["route"][mask]
+        n_routes = len(self.levels["route"])
+        by_route = np.bincount(route_code, weights=weights, minlength=n_routes)
+        route_seen = np.bincount(route_code, minlength=n_routes) > 0
+        route_totals = pd.Series(by_route[route_seen], index=self.levels["route"][route_seen], name=metric)
+        route_totals = route_totals.sort_values(ascending=False, kind="stable")
+        return CubeResult(time_series, route_totals)
+
+
+def filter_state(metric, year_range, month_range, ports, foreign_ports, continents, countries):
+    """Widget values as a hashable tuple (the memoization key of RouteCube.query)."""
+    return (metric, tuple(year_range), tuple(month_range), tuple(sorted(ports or ())),
+            tuple(sorted(foreign_ports or ())), tuple(sorted(continents or ())), tuple(sorted(countries or ())))
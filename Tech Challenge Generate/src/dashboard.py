@@ -4,72 +4,130 @@ Panel app that renders Plotly (plotly.go) figures.
 This combines Panel widgets with Plotly charts for:
 - Time series over time
 - Top/Bottom N routes
+
+Both views read from a pre-aggregated cube (cube.py) built once per process
+from a memory-mapped snapshot shared by all sessions and server processes
+(snapshot.py); a filter change is one memoized cube query shared by the two views,
+run off the event loop, and long lines are downsampled before they are sent.
 """
 
-import pandas as pd
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import plotly.graph_objects as go
 import panel as pn
+import cube
+import instrument
+import snapshot
+import store
+
+MAX_POINTS = 1000  # points per line sent to the browser; longer series are downsampled with LTTB
+
+# Cube queries run here so the server's event loop keeps serving other sessions
+executor = ThreadPoolExecutor(max_workers=4)
+
+
+def load_cleaned(cleaned_path="Outputs/clean/cleaned_data"):
+    """Read the dashboard columns from the columnar store (date is already datetime64)."""
+    return store.load_cleaned(cleaned_path, columns=cube.CUBE_COLUMNS)
+
+
+def load_cube(cleaned_path="Outputs/clean/cleaned_data"):
+    """RouteCube shared by every session of this process (reloaded when a new snapshot is published)."""
+    return snapshot.shared_dataset(cleaned_path).get()
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling: indices of at most threshold
+    points that keep the visual shape of the line (first and last always kept).
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(np.argmax(area))
+        keep[i + 1] = prev
+    return keep
 
-pn.extension('plotly', sizing_mode="stretch_width")
 
+def time_series_figure(ts, y_metric_val, max_points=MAX_POINTS):
+    keep = lttb(ts.index.asi8, ts.to_numpy(), max_points)
+    fig = go.Figure(data=[go.Scatter(x=ts.index[keep], y=ts.to_numpy()[keep], mode="lines")])
+    fig.update_layout(title=f"{y_metric_val} over time", xaxis_title="Date", yaxis_title=y_metric_val)
+    return fig
 
-def load_cleaned(cleaned_path="Outputs/clean/cleaned_data.csv"):
-    """Read cleaned data with parsed monthly date."""
-    return pd.read_csv(cleaned_path, parse_dates=["date"])  # date parsed as datetime
 
+def top_bottom_figures(agg, y_metric_val, topn, bottomn):
+    top = agg.head(int(topn) if topn else 10)
+    bottom = agg.tail(int(bottomn) if bottomn else 10)
+    top_fig = go.Figure(data=[go.Bar(x=top.values, y=top.index, orientation='h')])
+    top_fig.update_layout(title=f"Top {len(top)} routes by {y_metric_val}", xaxis_title=y_metric_val, yaxis_title="route")
+    bottom_fig = go.Figure(data=[go.Bar(x=bottom.values, y=bottom.index, orientation='h')])
+    bottom_fig.update_layout(title=f"Bottom {len(bottom)} routes by {y_metric_val}", xaxis_title=y_metric_val, yaxis_title="route")
+    return top_fig, bottom_fig
 
-def build_app(cleaned_path="Outputs/clean/cleaned_data.csv"):
-    """Build a Panel dashboard with simple filters and Plotly charts using pn.bind for live updates."""
-    df = load_cleaned(cleaned_path)
+
+def build_app(cleaned_path="Outputs/clean/cleaned_data"):
+    """
+    Build a Panel dashboard with simple filters and Plotly charts.
+
+    Range sliders only trigger on release (value_throttled). Cube queries run
+    in a thread pool from an async callback; a newer filter change supersedes
+    older ones, which are skipped if still queued and discarded if finished late.
+    """
+    pn.extension('plotly', sizing_mode="stretch_width")
+    data = load_cube(cleaned_path)
+    first_year, last_year = data.year_bounds()
 
     # Widgets
-    y_metric = pn.widgets.Select(name="Y-axis", value="passengers_total", options=[
-        "passengers_total", "passengers_total_z", "freight_total_tonnes", "mail_total_tonnes", "load_balance_ratio"
-    ])
-    year_range = pn.widgets.IntRangeSlider(name="Year", start=int(df["year"].min()), end=int(df["year"].max()), value=(int(df["year"].min()), int(df["year"].max())))
+    y_metric = pn.widgets.Select(name="Y-axis", value="passengers_total", options=data.metrics)
+    year_range = pn.widgets.IntRangeSlider(name="Year", start=first_year, end=last_year, value=(first_year, last_year))
     month_range = pn.widgets.IntRangeSlider(name="Month # (1-12)", start=1, end=12, value=(1, 12))
-    port = pn.widgets.MultiSelect(name="Australian Port", options=sorted(df["australian_port"].dropna().unique()))
-    fport = pn.widgets.MultiSelect(name="Foreign Port", options=sorted(df["foreign_port"].dropna().unique()))
-    continent = pn.widgets.MultiSelect(name="Continent", options=sorted(df["continent"].dropna().unique()))
-    country = pn.widgets.MultiSelect(name="Country", options=sorted(df["country"].dropna().unique()))
+    port = pn.widgets.MultiSelect(name="Australian Port", options=data.options("australian_port"))
+    fport = pn.widgets.MultiSelect(name="Foreign Port", options=data.options("foreign_port"))
+    continent = pn.widgets.MultiSelect(name="Continent", options=data.options("continent"))
+    country = pn.widgets.MultiSelect(name="Country", options=data.options("country"))
     top_n = pn.widgets.IntInput(name="Top N", value=10, start=1, end=100)
     bottom_n = pn.widgets.IntInput(name="Bottom N", value=10, start=1, end=100)
 
-    def filter_df(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals):
-        sub = df.copy()
-        sub = sub[(sub["month_num"] >= month_rng[0]) & (sub["month_num"] <= month_rng[1])]
-        sub = sub[(sub["year"] >= year_rng[0]) & (sub["year"] <= year_rng[1])]
-        if port_vals:
-            sub = sub[sub["australian_port"].isin(port_vals)]
-        if fport_vals:
-            sub = sub[sub["foreign_port"].isin(fport_vals)]
-        if continent_vals:
-            sub = sub[sub["continent"].isin(continent_vals)]
-        if country_vals:
-            sub = sub[sub["country"].isin(country_vals)]
-        return sub
-
-    def make_time_series(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals):
-        sub = filter_df(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals)
-        ts = sub.groupby("date")[y_metric_val].sum().sort_index()
-        fig = go.Figure(data=[go.Scatter(x=ts.index, y=ts.values, mode="lines")])
-        fig.update_layout(title=f"{y_metric_val} over time", xaxis_title="Date", yaxis_title=y_metric_val)
-        return pn.pane.Plotly(fig, config={"responsive": True})
-
-    def make_top_bottom(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals, topn, bottomn):
-        sub = filter_df(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals)
-        agg = sub.groupby("route")[y_metric_val].sum().sort_values(ascending=False)
-        top = agg.head(int(topn) if topn else 10)
-        bottom = agg.tail(int(bottomn) if bottomn else 10)
-        top_fig = go.Figure(data=[go.Bar(x=top.values, y=top.index, orientation='h')])
-        top_fig.update_layout(title=f"Top {len(top)} routes by {y_metric_val}", xaxis_title=y_metric_val, yaxis_title="route")
-        bottom_fig = go.Figure(data=[go.Bar(x=bottom.values, y=bottom.index, orientation='h')])
-        bottom_fig.update_layout(title=f"Bottom {len(bottom)} routes by {y_metric_val}", xaxis_title=y_metric_val, yaxis_title="route")
-        return pn.Row(pn.pane.Plotly(top_fig, config={"responsive": True}), pn.pane.Plotly(bottom_fig, config={"responsive": True}))
-
-    # Bind reactive views
-    ts_view = pn.bind(make_time_series, y_metric, year_range, month_range, port, fport, continent, country)
-    tb_view = pn.bind(make_top_bottom, y_metric, year_range, month_range, port, fport, continent, country, top_n, bottom_n)
+    # Initial figures are built here; later updates replace the pane objects
+    first = data.query(*cube.filter_state(y_metric.value, year_range.value, month_range.value, [], [], [], []))
+    ts_pane = pn.pane.Plotly(time_series_figure(first.time_series, y_metric.value), config={"responsive": True})
+    top_fig, bottom_fig = top_bottom_figures(first.route_totals, y_metric.value, top_n.value, bottom_n.value)
+    top_pane = pn.pane.Plotly(top_fig, config={"responsive": True})
+    bottom_pane = pn.pane.Plotly(bottom_fig, config={"responsive": True})
+    latest = {"token": 0}
+
+    def query_if_current(token, state):
+        if token != latest["token"]:
+            return None  # superseded while waiting for a thread
+        # memoized on the filter state, so both views share one result
+        with instrument.stage("dashboard_query", capture_warnings=False):
+            return data.query(*state)
+
+    async def refresh(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals, topn, bottomn):
+        latest["token"] += 1
+        token = latest["token"]
+        state = cube.filter_state(y_metric_val, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals)
+        result = await asyncio.get_running_loop().run_in_executor(executor, query_if_current, token, state)
+        if result is None or token != latest["token"]:
+            return
+        ts_pane.object = time_series_figure(result.time_series, y_metric_val)
+        top_pane.object, bottom_pane.object = top_bottom_figures(result.route_totals, y_metric_val, topn, bottomn)
+
+    pn.bind(refresh, y_metric, year_range.param.value_throttled, month_range.param.value_throttled,
+            port, fport, continent, country, top_n, bottom_n, watch=True)
 
     # Layout
     sidebar = pn.Column(
@@ -78,10 +136,21 @@ def build_app(cleaned_path="Outputs/clean/cleaned_data.csv"):
     )
     template = pn.template.BootstrapTemplate(title="AeroConnect Route Dashboard")
     template.sidebar.append(sidebar)
-    template.main.append(ts_view)
-    template.main.append(tb_view)
+    template.main.append(ts_pane)
+    template.main.append(pn.Row(top_pane, bottom_pane))
     return template
 
 
+def serve(cleaned_path="Outputs/clean/cleaned_data", port=5006, show=True, num_procs=1):
+    """
+    Serve the dashboard; every browser session gets its own build_app call.
+
+    With num_procs > 1 the server forks that many processes; they all map the
+    same snapshot file, published here once before forking.
+    """
+    snapshot.publish_snapshot(cleaned_path)
+    pn.serve(lambda: build_app(cleaned_path), port=port, show=show, num_procs=num_procs)
+
+
 if __name__ == "__main__":
-    pn.serve(build_app, show=True)
\ No newline at end of file
+    serve()
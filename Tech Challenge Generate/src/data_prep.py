@@ -7,11 +7,21 @@ Steps:
 - Create a proper monthly date
 - Add route keys and load balance features
 - Add a simple continent column (fallback mapping)
-- Add per-route z-scores for passengers_total
+- Add per-route z-scores for passengers_total (features.py, vectorized)
+- Save to the columnar cleaned-data store (see store.py)
+
+Inputs larger than memory can go through clean_and_enrich_streaming instead.
+New months can be appended with append_months, which keeps per-route running
+statistics (count/mean/M2, Welford style) so z-scores are updated without
+rescanning history.
 """
 
 import os
+import numpy as np
 import pandas as pd
+import features
+import instrument
+import store
 
 
 def ensure_output_dirs(base_dir):
@@ -31,9 +41,10 @@ def load_raw_csv(csv_path):
     return pd.read_csv(csv_path)
 
 
-def normalize_columns(df):
+def normalize_columns(df, copy=True):
     """Rename columns to easier names and keep the same information."""
-    return df.rename(
+    renamed = df.rename(
+        copy=copy,
         columns={
             "Month": "month_label",
             "AustralianPort": "australian_port",
@@ -52,32 +63,36 @@ def normalize_columns(df):
             "Month_num": "month_num",
         }
     )
+    return renamed
 
 
-def parse_dates(df):
+def parse_dates(df, copy=True):
     """Build a monthly date using the provided year and month number."""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     df["date"] = pd.to_datetime(dict(year=df["year"], month=df["month_num"], day=1))
     return df
 
 
-def add_route_keys(df):
+def add_route_keys(df, copy=True):
     """Create route names like "Sydney → Auckland" and a city_pair helper."""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     df["route"] = df["australian_port"].astype(str) + " → " + df["foreign_port"].astype(str)
     df["city_pair"] = df["australian_port"].astype(str) + " | " + df["country"].astype(str)
     return df
 
 
-def add_load_balance_features(df):
+def add_load_balance_features(df, copy=True):
     """Add simple load balance features: difference and ratio (in vs out)."""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     df["load_balance_diff"] = df["passengers_in"] - df["passengers_out"]
     df["load_balance_ratio"] = df["passengers_in"] / df["passengers_out"].replace({0: pd.NA})
     return df
 
 
-def add_continent(df):
+def add_continent(df, copy=True):
     """
     Add a continent column using a small fallback map.
     This avoids extra dependencies and is easy to understand.
@@ -124,48 +139,228 @@ def add_continent(df):
         "Mexico": "North America",
         "China": "Asia",
     }
-    df = df.copy()
+    if copy:
+        df = df.copy()
     df["continent"] = df["country"].map(fallback_map).fillna("Unknown")
     return df
 
 
 def add_z_scores(df):
     """Compute a simple z-score per route for passengers_total (mean 0, std 1)."""
-    df = df.copy()
+    return features.build_features(df, ["passengers_total_z"])
+
+
+def compute_route_stats(df):
+    """Per-route count, mean, M2 (sum of squared deviations) and last date."""
+    values = df["passengers_total"].astype(float)
+    grouped = values.groupby(df["route"].astype(str))
+    stats = pd.DataFrame({
+        "count": grouped.count().astype(float),
+        "mean": grouped.mean(),
+        "m2": grouped.var(ddof=0) * grouped.count(),
+    })
+    stats["last_date"] = df.groupby(df["route"].astype(str))["date"].max()
+    stats.index.name = "route"
+    return stats
+
 
-    def compute_group_z(group):
-        values = group["passengers_total"].astype(float)
-        mean_value = values.mean()
-        std_value = values.std(ddof=0)
-        if std_value == 0 or pd.isna(std_value):
-            return pd.Series([0.0] * len(group), index=group.index)
-        return (values - mean_value) / std_value
+def merge_route_stats(old, new):
+    """
+    Combine two sets of route statistics (Chan et al. parallel Welford update).
+
+    Routes only present in one side are carried over unchanged.
+    """
+    routes = old.index.union(new.index)
+    a = old.reindex(routes)
+    b = new.reindex(routes)
+    n_a = a["count"].fillna(0.0)
+    n_b = b["count"].fillna(0.0)
+    n = n_a + n_b
+    delta = b["mean"].fillna(0.0) - a["mean"].fillna(0.0)
+    safe_n = n.where(n > 0, 1.0)
+    merged = pd.DataFrame({
+        "count": n,
+        "mean": a["mean"].fillna(0.0) + delta * n_b / safe_n,
+        "m2": a["m2"].fillna(0.0) + b["m2"].fillna(0.0) + delta ** 2 * n_a * n_b / safe_n,
+        "last_date": pd.concat([a["last_date"], b["last_date"]], axis=1).max(axis=1),
+    }, index=routes)
+    # A route seen for the first time just takes the new side's values
+    only_new = n_a == 0
+    merged.loc[only_new, "mean"] = b.loc[only_new, "mean"]
+    merged.loc[only_new, "m2"] = b.loc[only_new, "m2"]
+    merged.index.name = "route"
+    return merged
 
-    df["passengers_total_z"] = df.groupby("route", group_keys=False).apply(compute_group_z)
+
+def apply_route_stats(df, stats):
+    """Set passengers_total_z from stored route statistics (same result as add_z_scores)."""
+    route_stats = stats.reindex(df["route"].astype(str))
+    std_value = np.sqrt(route_stats["m2"].to_numpy() / route_stats["count"].to_numpy())
+    values = df["passengers_total"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (values - route_stats["mean"].to_numpy()) / std_value
+    z[~np.isfinite(z)] = 0.0
+    df["passengers_total_z"] = z
     return df
 
 
-def clean_and_enrich(csv_path, outputs_dir):
+def route_stats_path(outputs_dir):
+    return os.path.join(outputs_dir, "clean", "route_stats.parquet")
+
+
+def load_route_stats(outputs_dir):
+    """Read saved route statistics (written by clean_and_enrich / append_months)."""
+    path = route_stats_path(outputs_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No route statistics at {path}; run clean_and_enrich first")
+    return pd.read_parquet(path)
+
+
+def save_route_stats(stats, outputs_dir):
+    stats.to_parquet(route_stats_path(outputs_dir))
+
+
+def enrich_rows(raw, copy=True):
+    """
+    Apply every row-level step (everything except the per-route z-score).
+
+    With copy=False the steps add columns to raw in place instead of copying
+    it at every step (used for streaming chunks nobody else holds on to).
+    """
+    df = normalize_columns(raw, copy=copy)
+    df = parse_dates(df, copy=copy)
+    df = add_route_keys(df, copy=copy)
+    df = add_load_balance_features(df, copy=copy)
+    df = add_continent(df, copy=copy)
+    return df
+
+
+def clean_and_enrich(csv_path, outputs_dir, extra_features=None):
+    """
+    Run the full cleaning/enrichment and save it to the cleaned-data store.
+
+    extra_features is an optional list of names from features.FEATURES (rolling
+    12-month sums, YoY growth, seasonal index, load-balance trends) to store
+    alongside the z-score.
+
+    Returns the DataFrame and the path to the store folder.
+    """
+    ensure_output_dirs(outputs_dir)
+    with instrument.stage("load_raw_csv"):
+        raw = load_raw_csv(csv_path)
+    with instrument.stage("enrich_rows"):
+        df = enrich_rows(raw)
+    with instrument.stage("add_features"):
+        df = add_z_scores(df)
+        if extra_features:
+            df = features.build_features(df, extra_features, copy=False)
+
+    with instrument.stage("write_store"):
+        cleaned_path = store.write_cleaned(df, os.path.join(outputs_dir, "clean", "cleaned_data"))
+        save_route_stats(compute_route_stats(df), outputs_dir)
+    return df, cleaned_path
+
+
+def clean_and_enrich_streaming(csv_path, outputs_dir, chunksize=250_000):
     """
-    Run the full cleaning/enrichment and save the cleaned CSV.
+    Same output as clean_and_enrich, but never holds the whole raw file in memory.
 
-    Returns the DataFrame and the path to the saved CSV.
+    Pass 1 reads the raw CSV in chunks of `chunksize` rows, enriches each chunk
+    in place, writes it as its own store part and merges the chunk's route
+    statistics. Pass 2 rewrites the parts one at a time with the final z-scores.
+    Peak memory is roughly one chunk plus the per-route statistics.
+
+    Returns the path to the store folder and the route statistics.
     """
     ensure_output_dirs(outputs_dir)
-    raw = load_raw_csv(csv_path)
-    df = normalize_columns(raw)
-    df = parse_dates(df)
-    df = add_route_keys(df)
-    df = add_load_balance_features(df)
-    df = add_continent(df)
-    df = add_z_scores(df)
-
-    cleaned_path = os.path.join(outputs_dir, "clean", "cleaned_data.csv")
-    df.to_csv(cleaned_path, index=False)
+    cleaned_path = os.path.join(outputs_dir, "clean", "cleaned_data")
+    for path in store.list_parts(cleaned_path):
+        os.remove(path)
+
+    stats = None
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        df = enrich_rows(chunk, copy=False)
+        chunk_stats = compute_route_stats(df)
+        stats = chunk_stats if stats is None else merge_route_stats(stats, chunk_stats)
+        df["passengers_total_z"] = np.nan  # filled in by the second pass
+        store.append_part(df, cleaned_path)
+        del df, chunk
+
+    if stats is None:
+        raise ValueError(f"{csv_path} has no rows")
+    restate_z_scores(cleaned_path, stats)
+    save_route_stats(stats, outputs_dir)
+    return cleaned_path, stats
+
+
+def append_features(df, cleaned_path, names):
+    """
+    Compute trailing feature columns (features.LOOKBACK_MONTHS) for appended rows.
+
+    Only the stored months the features look back on are read. Raises
+    ValueError for features that need the whole history (seasonal_index).
+    """
+    whole_history = [name for name in names if name not in features.LOOKBACK_MONTHS]
+    if whole_history:
+        raise ValueError(f"append_months cannot maintain {whole_history}; rebuild the store with clean_and_enrich")
+    start = df["date"].min() - pd.DateOffset(months=max(features.LOOKBACK_MONTHS[name] for name in names))
+    history = store.load_cleaned(cleaned_path, columns=features.INPUT_COLUMNS, start=start)
+    history["route"] = history["route"].astype(str)
+    combined = pd.concat([history, df[features.INPUT_COLUMNS]], ignore_index=True)
+    combined = features.build_features(combined, names, copy=False)
+    for name in names:
+        df[name] = combined[name].to_numpy()[len(history):]
+    return df
+
+
+def append_months(csv_path, outputs_dir, restate=False):
+    """
+    Append only the new monthly rows in csv_path to the existing cleaned store.
+
+    Route statistics are merged with the new rows, so the new rows get z-scores
+    against the full history without rereading it. Older rows keep the z-scores
+    they were written with unless restate=True, which rewrites every stored part
+    with the updated statistics (no raw CSV is reread). Trailing feature columns
+    in the store are computed for the new rows from the months they look back
+    on; a store with seasonal_index has to be rebuilt instead.
+
+    Returns the new rows and the path to the store folder.
+    """
+    cleaned_path = os.path.join(outputs_dir, "clean", "cleaned_data")
+    old_stats = load_route_stats(outputs_dir)
+    stored_features = [col for col in store.stored_columns(cleaned_path)
+                       if col in features.FEATURES and col != "passengers_total_z"]
+    df = enrich_rows(load_raw_csv(csv_path))
+
+    # Refuse months that are already in the store so statistics are not double counted
+    last_date = old_stats["last_date"].reindex(df["route"]).to_numpy()
+    already_loaded = pd.notna(last_date) & (df["date"].to_numpy() <= last_date)
+    if already_loaded.any():
+        raise ValueError(f"{int(already_loaded.sum())} rows in {csv_path} are not newer than the stored data")
+
+    stats = merge_route_stats(old_stats, compute_route_stats(df))
+    df = apply_route_stats(df, stats)
+    if stored_features:
+        df = append_features(df, cleaned_path, stored_features)
+    store.append_part(df, cleaned_path)
+    save_route_stats(stats, outputs_dir)
+
+    if restate:
+        restate_z_scores(cleaned_path, stats)
     return df, cleaned_path
 
+
+def restate_z_scores(cleaned_path, stats):
+    """Recompute passengers_total_z in every stored part, one part at a time."""
+    for path in store.list_parts(cleaned_path):
+        part = pd.read_parquet(path)
+        part = apply_route_stats(part, stats)
+        store.write_part(part, cleaned_path, os.path.splitext(os.path.basename(path))[0])
+
 def main():
     df_clean, cleaned_path = clean_and_enrich("TechChallenge_Data.csv", "Outputs")
     print(df_clean)
 
-main()
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
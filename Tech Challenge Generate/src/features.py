@@ -0,0 +1,163 @@
+"""
+Per-route feature engineering in single vectorized passes.
+
+Every feature is computed for all routes at once with NumPy segment
+operations (bincount / cumsum / searchsorted on route-month keys), so the
+cost grows linearly with rows and there is no Python work per route.
+
+Features are declared in FEATURES; pick the ones to materialize with
+build_features(df, ["passengers_rolling_12", ...]).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class RouteMonthLayout:
+    """
+    Shared indexing for route features, built once per DataFrame.
+
+    Rows are mapped to unique (route, month) keys; features that look back in
+    time work on the per-key totals and are mapped back to rows at the end.
+    """
+
+    def __init__(self, df):
+        route_codes, self.routes = pd.factorize(df["route"], sort=True)
+        self.n_routes = len(self.routes)
+        self.row_route = route_codes.astype(np.int64)
+        month_index = df["date"].dt.year.to_numpy(dtype=np.int64) * 12 + df["date"].dt.month.to_numpy(dtype=np.int64) - 1
+        self.month_span = int(month_index.max()) + 13 if len(month_index) else 13
+        row_keys = self.row_route * self.month_span + month_index
+        # keys are sorted, so each route's months form one contiguous, ordered segment
+        self.keys, self.row_to_key = np.unique(row_keys, return_inverse=True)
+        self.key_route = self.keys // self.month_span
+        self.key_month = self.keys % self.month_span
+
+    def key_sum(self, values):
+        """Sum row values into their (route, month) key."""
+        return np.bincount(self.row_to_key, weights=values, minlength=len(self.keys))
+
+    def to_rows(self, key_values):
+        return key_values[self.row_to_key]
+
+    def rolling_sum(self, key_values, window=12):
+        """Sum over the last `window` calendar months (inclusive) within each route."""
+        cumulative = np.concatenate([[0.0], np.cumsum(key_values)])
+        start = np.searchsorted(self.keys, self.keys - (window - 1), side="left")
+        end = np.arange(1, len(self.keys) + 1)
+        return cumulative[end] - cumulative[start]
+
+    def lag(self, key_values, months=12):
+        """Value from `months` earlier on the same route (NaN when that month is missing)."""
+        target = self.keys - months
+        pos = np.searchsorted(self.keys, target)
+        pos_clipped = np.minimum(pos, len(self.keys) - 1)
+        found = (pos < len(self.keys)) & (self.keys[pos_clipped] == target)
+        return np.where(found, key_values[pos_clipped], np.nan)
+
+
+def route_z_score(df, layout):
+    """Whole-history z-score of passengers_total per route (population std, 0 when flat)."""
+    values = df["passengers_total"].to_numpy(dtype=float)
+    counts = np.bincount(layout.row_route, minlength=layout.n_routes)
+    means = np.bincount(layout.row_route, weights=values, minlength=layout.n_routes) / np.maximum(counts, 1)
+    deviations = values - means[layout.row_route]
+    variances = np.bincount(layout.row_route, weights=deviations ** 2, minlength=layout.n_routes) / np.maximum(counts, 1)
+    std_value = np.sqrt(variances)[layout.row_route]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = deviations / std_value
+    z[~np.isfinite(z)] = 0.0
+    return z
+
+
+def rolling_12_sum(df, layout):
+    """Passengers over the trailing 12 calendar months of the route."""
+    totals = layout.key_sum(df["passengers_total"].to_numpy(dtype=float))
+    return layout.to_rows(layout.rolling_sum(totals, 12))
+
+
+def yoy_growth(df, layout):
+    """Growth vs the same month last year (NaN without a prior-year value)."""
+    totals = layout.key_sum(df["passengers_total"].to_numpy(dtype=float))
+    previous = layout.lag(totals, 12)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(previous > 0, totals / previous - 1.0, np.nan)
+    return layout.to_rows(growth)
+
+
+def seasonal_index(df, layout):
+    """Route's average for this calendar month divided by its overall monthly average."""
+    totals = layout.key_sum(df["passengers_total"].to_numpy(dtype=float))
+    calendar_month = layout.key_month % 12
+    cell = layout.key_route * 12 + calendar_month
+    n_cells = layout.n_routes * 12
+    cell_mean = np.bincount(cell, weights=totals, minlength=n_cells) / np.maximum(np.bincount(cell, minlength=n_cells), 1)
+    route_mean = np.bincount(layout.key_route, weights=totals, minlength=layout.n_routes) / np.maximum(np.bincount(layout.key_route, minlength=layout.n_routes), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index = np.where(route_mean[layout.key_route] > 0, cell_mean[cell] / route_mean[layout.key_route], np.nan)
+    return layout.to_rows(index)
+
+
+def rolling_in_out_ratio(df, layout):
+    """Trailing 12-month passengers in / out per (route, month) key."""
+    passengers_in = layout.rolling_sum(layout.key_sum(df["passengers_in"].to_numpy(dtype=float)), 12)
+    passengers_out = layout.rolling_sum(layout.key_sum(df["passengers_out"].to_numpy(dtype=float)), 12)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(passengers_out > 0, passengers_in / passengers_out, np.nan)
+
+
+def load_balance_ratio_12(df, layout):
+    """Passengers in / out over the trailing 12 months (smooths the monthly ratio)."""
+    return layout.to_rows(rolling_in_out_ratio(df, layout))
+
+
+def load_balance_trend_12(df, layout):
+    """Change of load_balance_ratio_12 vs 12 months earlier (positive = more inbound)."""
+    ratio = rolling_in_out_ratio(df, layout)
+    return layout.to_rows(ratio - layout.lag(ratio, 12))
+
+
+# Column name -> function(df, layout) returning one value per row
+FEATURES = {
+    "passengers_total_z": route_z_score,
+    "passengers_rolling_12": rolling_12_sum,
+    "passengers_yoy_growth": yoy_growth,
+    "seasonal_index": seasonal_index,
+    "load_balance_ratio_12": load_balance_ratio_12,
+    "load_balance_trend_12": load_balance_trend_12,
+}
+
+DEFAULT_FEATURES = ["passengers_total_z"]
+
+# Months before a row that a trailing feature reads; features not listed here
+# (z-score, seasonal index) depend on the route's whole history
+LOOKBACK_MONTHS = {
+    "passengers_rolling_12": 11,
+    "passengers_yoy_growth": 12,
+    "load_balance_ratio_12": 11,
+    "load_balance_trend_12": 23,
+}
+
+# Columns the feature functions read
+INPUT_COLUMNS = ["route", "date", "passengers_total", "passengers_in", "passengers_out"]
+
+
+def build_features(df, features=None, copy=True):
+    """
+    Add the requested feature columns to df.
+
+    Parameters:
+    - df: Enriched frame with route, date, passengers_total/in/out
+    - features: List of names from FEATURES (default: DEFAULT_FEATURES)
+    - copy: Set False to add the columns to df in place
+    """
+    features = DEFAULT_FEATURES if features is None else list(features)
+    unknown = [name for name in features if name not in FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown features {unknown}; choose from {sorted(FEATURES)}")
+    if copy:
+        df = df.copy()
+    layout = RouteMonthLayout(df)
+    for name in features:
+        df[name] = FEATURES[name](df, layout)
+    return df
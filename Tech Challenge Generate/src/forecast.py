@@ -3,23 +3,39 @@ Advanced forecasting using SARIMA; tried Linear Regression - not as successful
 
 Top approach:
 SARIMA (best): Traditional time series model for seasonal data
+
+statsmodels, scikit-learn and the plotting libraries are imported inside the
+functions that use them, so importing this module stays cheap.
+
+select_route returns the same series from the cleaned DataFrame or a
+RouteIndex: every month from the route's first to its last observed month,
+with months that have no rows as 0 passengers (SARIMAX needs a regular
+monthly index).
 """
 
 import json
 import os
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-import seaborn as sns
-import matplotlib.pyplot as plt
+import instrument
+import store
+from route_index import RouteIndex
 
 
 def select_route(df, australian_port, country, foreign_port):
-    """Get a monthly series for the specified route."""
+    """
+    Get a monthly series for the specified route.
+
+    df can be the cleaned DataFrame or a RouteIndex built from it; the index is
+    the fast path when many routes are fetched from the same data.
+    """
+    if isinstance(df, RouteIndex):
+        return df.series(australian_port, country, foreign_port)
     sub = df[(df["australian_port"] == australian_port) & (df["country"] == country) & (df["foreign_port"] == foreign_port)]
-    ts = sub.groupby("date")["passengers_total"].sum().sort_index()
+    ts = sub.groupby("date")["passengers_total"].sum().sort_index().astype(float)
+    if len(ts):
+        ts = ts.reindex(pd.date_range(ts.index[0], ts.index[-1], freq="MS", name="date"), fill_value=0.0)
+    ts.name = str(sub["route"].iloc[0]) if "route" in sub.columns and len(sub) else None
     return ts
 
 
@@ -29,17 +45,46 @@ def train_test_split_time_series(ts, train_end, test_end):
     test = ts[pd.to_datetime(train_end) + pd.offsets.MonthBegin(1) : test_end]
     return train, test
 
-def fit_sarima(train_series, seasonal_period=12):
-    """Fit SARIMA model with seasonal components."""
-    # SARIMA(1,1,1)(1,1,1,12) - handles trend and seasonality
-    model = SARIMAX(
+def build_sarima(train_series, order=(1, 1, 1), seasonal_order=None, seasonal_period=12):
+    """Create the (unfitted) SARIMAX model used everywhere in this project."""
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    if seasonal_order is None:
+        seasonal_order = (1, 1, 1, seasonal_period)
+    return SARIMAX(
             train_series,
-            order=(1, 1, 1),
-            seasonal_order=(1, 1, 1, seasonal_period),
+            order=tuple(order),
+            seasonal_order=tuple(seasonal_order),
             enforce_stationarity=False,
             enforce_invertibility=False)
-    fitted = model.fit(disp=False)
-    return fitted
+
+
+def fit_sarima(train_series, seasonal_period=12, order=(1, 1, 1), seasonal_order=None,
+               start_params=None, maxiter=None, return_record=False):
+    """
+    Fit SARIMA model with seasonal components.
+
+    Defaults to SARIMA(1,1,1)(1,1,1,12). start_params warm-starts the optimizer
+    (e.g. from a previous fit) and maxiter caps its iterations. With
+    return_record=True returns (fitted, instrument record of the fit).
+    """
+    # SARIMA(1,1,1)(1,1,1,12) - handles trend and seasonality
+    model = build_sarima(train_series, order=order, seasonal_order=seasonal_order, seasonal_period=seasonal_period)
+    fit_kwargs = {"disp": False}
+    if start_params is not None:
+        fit_kwargs["start_params"] = start_params
+    if maxiter is not None:
+        fit_kwargs["maxiter"] = maxiter
+    with instrument.stage("sarima_fit") as record:
+        fitted = model.fit(**fit_kwargs)
+        record.update(instrument.fit_info(fitted), nobs=len(train_series))
+    return (fitted, record) if return_record else fitted
+
+
+def filter_sarima(train_series, params, order=(1, 1, 1), seasonal_order=None, seasonal_period=12):
+    """Apply already-estimated params to train_series (one Kalman filter pass, no optimizer)."""
+    model = build_sarima(train_series, order=order, seasonal_order=seasonal_order, seasonal_period=seasonal_period)
+    return model.filter(params)
 
 
 def forecast_sarima(fitted_model, steps):
@@ -50,6 +95,8 @@ def forecast_sarima(fitted_model, steps):
 # ===== EVALUATION =====
 def evaluate_forecast(y_true, y_pred):
     """Compute MAE, RMSE, and MAPE."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
     y_pred = y_pred.reindex(y_true.index)
     mae = float(mean_absolute_error(y_true, y_pred))
     rmse = float(np.sqrt(mean_squared_error(y_true, y_pred)))
@@ -63,34 +110,65 @@ def evaluate_forecast(y_true, y_pred):
     }
 
 
-# ===== MAIN BACKTEST FUNCTIONS =====
-def run_sarima_backtest(df, outputs_dir, australian_port, foreign_port, country, train_end, test_end, label):
-    """Run SARIMA backtest."""
-    ts = select_route(df, australian_port=australian_port, country=country, foreign_port=foreign_port)
-    if ts.empty:
-        raise ValueError(f"No data for route {australian_port} → {foreign_port} ({country})")
-
+# ===== SINGLE-SERIES HELPERS =====
+def backtest_series(ts, train_end, test_end, order=(1, 1, 1), seasonal_order=None):
+    """Fit SARIMA on ts up to train_end and evaluate it on the months up to test_end."""
     train, test = train_test_split_time_series(ts, train_end=train_end, test_end=test_end)
-    steps = len(test)
 
     # Fit SARIMA
-    fitted_model = fit_sarima(train)
+    fitted_model, record = fit_sarima(train, order=order, seasonal_order=seasonal_order, return_record=True)
     if fitted_model is None:
         raise ValueError("SARIMA model fitting failed")
 
-    # Forecast
-    preds = forecast_sarima(fitted_model, steps)
+    result = evaluate_fitted(fitted_model, test)
+    result["fit"] = instrument.fit_summary(record)
+    return result
+
+
+def evaluate_fitted(fitted_model, test):
+    """Forecast the months of test from an already fitted model and evaluate them."""
+    preds = forecast_sarima(fitted_model, len(test))
     if preds is None:
         raise ValueError("SARIMA forecasting failed")
-
     preds.index = test.index
-    result = evaluate_forecast(test, preds)
+    return evaluate_forecast(test, preds)
+
+
+def forecast_series(ts, train_end, forecast_months, order=(1, 1, 1), seasonal_order=None):
+    """Fit SARIMA on ts up to train_end and forecast the next forecast_months months."""
+    train = ts[:train_end]
+
+    # Fit SARIMA model
+    fitted_model = fit_sarima(train, order=order, seasonal_order=seasonal_order)
+    if fitted_model is None:
+        raise ValueError("SARIMA model fitting failed")
+    return dated_forecast(fitted_model, train_end, forecast_months)
+
+
+def dated_forecast(fitted_model, train_end, forecast_months):
+    """Forecast the months after train_end and index them by month start date."""
+    future_dates = pd.date_range(start=pd.to_datetime(train_end) + pd.offsets.MonthBegin(1),
+                                 periods=forecast_months, freq="MS")
+    future_forecast = fitted_model.forecast(steps=forecast_months)
+    future_forecast.index = future_dates
+    return future_forecast
+
+
+# ===== MAIN BACKTEST FUNCTIONS =====
+def run_sarima_backtest(df, outputs_dir, australian_port, foreign_port, country, train_end, test_end, label):
+    """Run SARIMA backtest."""
+    ts = select_route(df, australian_port=australian_port, country=country, foreign_port=foreign_port)
+    if ts.empty:
+        raise ValueError(f"No data for route {australian_port} → {foreign_port} ({country})")
+
+    with instrument.stage("sarima_backtest", route=f"{australian_port} → {foreign_port}"):
+        result = backtest_series(ts, train_end=train_end, test_end=test_end)
 
     # Save results
     os.makedirs(os.path.join(outputs_dir, "models"), exist_ok=True)
     metrics_path = os.path.join(outputs_dir, "models", f"{label}_sarima_metrics.json")
     with open(metrics_path, "w", encoding="utf-8") as f:
-        json.dump({"mae": result["mae"], "rmse": result["rmse"], "mape": result["mape"]}, f, indent=2)
+        json.dump({"mae": result["mae"], "rmse": result["rmse"], "mape": result["mape"], "fit": result["fit"]}, f, indent=2)
 
     backtest_df = pd.DataFrame({"y_true": result["y_true"], "y_pred": result["y_pred"]})
     backtest_df.to_csv(os.path.join(outputs_dir, "models", f"{label}_sarima_backtest.csv"))
@@ -103,7 +181,7 @@ def forecast_future_sarima(df, outputs_dir, australian_port, foreign_port, count
     Forecast future months using SARIMA model trained on all available data.
 
     Parameters:
-    - df: Cleaned DataFrame
+    - df: Cleaned DataFrame or RouteIndex
     - australian_port, foreign_port, country: Route details
     - train_end: Train on data up to this date
     - forecast_months: How many months to predict ahead
@@ -114,19 +192,9 @@ def forecast_future_sarima(df, outputs_dir, australian_port, foreign_port, count
     if ts.empty:
         raise ValueError(f"No data for route {australian_port} → {foreign_port} ({country})")
 
-    # Train on ALL available data (up to July 1989)
-    train = ts[:train_end]
-
-    # Fit SARIMA model
-    fitted_model = fit_sarima(train)
-    if fitted_model is None:
-        raise ValueError("SARIMA model fitting failed")
-
-    # Forecast next 6 months
-    future_dates = pd.date_range(start=pd.to_datetime(train_end) + pd.offsets.MonthBegin(1),
-                                 periods=forecast_months, freq="MS")
-    future_forecast = fitted_model.forecast(steps=forecast_months)
-    future_forecast.index = future_dates
+    # Train on ALL available data (up to July 1989) and forecast the next months
+    with instrument.stage("sarima_forecast", route=f"{australian_port} → {foreign_port}"):
+        future_forecast = forecast_series(ts, train_end=train_end, forecast_months=forecast_months)
 
     # Save forecast
     os.makedirs(os.path.join(outputs_dir, "models"), exist_ok=True)
@@ -140,13 +208,18 @@ def forecast_future_sarima(df, outputs_dir, australian_port, foreign_port, count
 
     return forecast_df
 
-def main():
-    df = pd.read_csv("Outputs/clean/cleaned_data.csv", parse_dates=["date"])
+def main(outputs_dir="Outputs"):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    df = store.load_cleaned(os.path.join(outputs_dir, "clean", "cleaned_data"), columns=[
+        "date", "route", "australian_port", "foreign_port", "country", "passengers_total"])
+    index = RouteIndex(df)
 
     # Test both approaches
     results = run_sarima_backtest(
-        df=df,
-        outputs_dir="Outputs",
+        df=index,
+        outputs_dir=outputs_dir,
         australian_port="Sydney",
         foreign_port="Auckland",
         country="New Zealand",
@@ -159,8 +232,8 @@ def main():
 
     # Forecast next n months for Melbourne → Singapore
     future_df = forecast_future_sarima(
-        df=df,
-        outputs_dir="Outputs",
+        df=index,
+        outputs_dir=outputs_dir,
         australian_port="Melbourne",
         foreign_port="Singapore",
         country="Singapore",
@@ -189,9 +262,11 @@ def main():
     plt.xlabel("Date")
     plt.ylabel("Passengers")
     plt.tight_layout()
-    plt.savefig("Outputs/figures/mel_sin_actual_pred.png")
+    plt.savefig(os.path.join(outputs_dir, "figures", "mel_sin_actual_pred.png"))
     plt.show()
 
     print(df_merged)
 
-main()
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
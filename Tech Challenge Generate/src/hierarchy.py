@@ -0,0 +1,121 @@
+"""
+Coherent forecasts for routes and their totals by port, country and continent.
+
+The summing structure is a sparse matrix S (nodes x routes): one row for the
+grand total, one per continent, country and australian_port, and an identity
+block for the routes themselves. Only the routes are forecast as base series;
+aggregate nodes are never given their own SARIMA fit.
+
+Reconciliation methods:
+- bottom_up: aggregates are sums of the route forecasts
+- ols: projects base forecasts of every node onto the coherent subspace (W = I)
+- wls_struct: same with W = diag(number of routes under each node)
+- mint_diag: MinT with W = diag(holdout error variance of each node)
+
+For the methods that need base forecasts of aggregate nodes, those come from
+the vectorized fast tier (baselines.py) run once over the node matrix.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+import baselines
+
+LEVELS = ["continent", "country", "australian_port"]
+METHODS = ["bottom_up", "ols", "wls_struct", "mint_diag"]
+
+
+def summing_matrix(routes, levels=LEVELS):
+    """
+    Build S for the routes table of a RouteIndex.
+
+    Returns (S, nodes): S is a CSR matrix (nodes x routes); nodes is a DataFrame
+    with level and name for each row of S (Total first, routes last).
+    """
+    n_routes = len(routes)
+    blocks = [sp.csr_matrix(np.ones((1, n_routes)))]
+    labels = [("total", "Total")]
+    for level in levels:
+        if level not in routes.columns:
+            continue
+        codes, groups = pd.factorize(routes[level], sort=True)
+        block = sp.csr_matrix((np.ones(n_routes), (codes, np.arange(n_routes))), shape=(len(groups), n_routes))
+        blocks.append(block)
+        labels.extend((level, str(group)) for group in groups)
+    blocks.append(sp.identity(n_routes, format="csr"))
+    labels.extend(("route", str(route)) for route in routes["route"])
+    return sp.vstack(blocks, format="csr"), pd.DataFrame(labels, columns=["level", "name"])
+
+
+def reconcile(S, base, method="ols", variances=None):
+    """
+    Reconcile base forecasts (horizon x nodes) into coherent ones (horizon x nodes).
+
+    bottom_up only reads the route columns of base. variances (one per node)
+    are required for mint_diag.
+    """
+    n_bottom = S.shape[1]
+    if method == "bottom_up":
+        bottom = base[:, -n_bottom:]
+        return np.asarray(S @ bottom.T).T
+
+    if method == "ols":
+        weights = np.ones(S.shape[0])
+    elif method == "wls_struct":
+        weights = 1.0 / np.asarray(S.sum(axis=1)).ravel()
+    elif method == "mint_diag":
+        if variances is None:
+            raise ValueError("mint_diag needs the base forecast error variance of each node")
+        weights = 1.0 / np.maximum(np.asarray(variances, dtype=float), 1e-9)
+    else:
+        raise ValueError(f"Unknown method {method}; choose from {METHODS}")
+
+    # G = (S' W^-1 S)^-1 S' W^-1, applied without forming G
+    W_inv = sp.diags(weights)
+    lhs = (S.T @ W_inv @ S).tocsc()
+    rhs = S.T @ W_inv @ base.T
+    bottom = splu(lhs).solve(np.asarray(rhs))
+    return np.asarray(S @ bottom).T
+
+
+def hierarchical_forecast(index, outputs_dir=None, method="mint_diag", horizon=12, holdout=6,
+                          bottom_forecasts=None, levels=LEVELS):
+    """
+    Coherent forecasts for every node of the route hierarchy.
+
+    Parameters:
+    - index: RouteIndex built with a continent column
+    - method: One of METHODS
+    - bottom_forecasts: Optional dates x routes DataFrame (e.g. SARIMA) used as
+      the route base forecasts; default is the fast tier
+    - outputs_dir: If given, writes Outputs/models/hierarchy_forecasts.csv
+
+    Returns a long DataFrame with date, level, node, base and reconciled.
+    """
+    S, nodes = summing_matrix(index.routes, levels=levels)
+    mask = baselines.presence_mask(index)
+    node_history = np.asarray(S @ index.matrix.T).T  # dates x nodes
+    node_mask = np.asarray(S @ mask.T.astype(float)).T > 0
+
+    # One vectorized fast-tier pass gives base forecasts and error variances for all nodes
+    _, _, base, holdout_mse = baselines.fast_forecast_matrix(node_history, node_mask, horizon=horizon, holdout=holdout)
+    if bottom_forecasts is not None:
+        routes = index.routes["route"].tolist()
+        base[:, -len(routes):] = bottom_forecasts[routes].to_numpy()[:horizon]
+
+    reconciled = reconcile(S, base, method=method, variances=holdout_mse)
+    dates = baselines.future_dates(index.dates, horizon)
+    result = pd.DataFrame({
+        "date": np.repeat(dates, S.shape[0]),
+        "level": np.tile(nodes["level"].to_numpy(), horizon),
+        "node": np.tile(nodes["name"].to_numpy(), horizon),
+        "base": base.ravel(),
+        "reconciled": reconciled.ravel(),
+    })
+    if outputs_dir is not None:
+        models_dir = os.path.join(outputs_dir, "models")
+        os.makedirs(models_dir, exist_ok=True)
+        result.to_csv(os.path.join(models_dir, "hierarchy_forecasts.csv"), index=False)
+    return result
@@ -0,0 +1,287 @@
+"""
+Stage timing, memory and SARIMAX fit instrumentation.
+
+Wrap a step in `with instrument.stage("name", route=...) as record:` and it
+records wall and CPU seconds, memory, the warnings raised inside and any
+fields the block adds to record (e.g. fit_info(fitted) for SARIMAX iterations
+and convergence). Memory is recorded per stage: rss_delta_mb is the change in
+current RSS across the stage and peak_growth_mb how far the stage raised the
+process peak RSS (0 when an earlier stage already reached a higher peak).
+Labels of an enclosing stage are inherited, so a SARIMAX fit inside a route
+stage is attributed to that route.
+
+Each process has one Recorder (RECORDER). It keeps the latest records and
+running totals per stage, and can write them as JSON or Prometheus text.
+Process pools run their tasks through call_collected / map_collected, which
+send the records a worker produced back and merge them into the parent's
+RECORDER.
+
+Profiling is opt-in: stage(..., profile=True) or the AEROCONNECT_PROFILE
+environment variable (comma-separated stage names, or "all") runs the stage
+under cProfile and writes Outputs/profiles/<stage>_<time>.prof (or under
+AEROCONNECT_PROFILE_DIR) plus a .txt summary of the top functions. Both
+variables are inherited by worker processes.
+"""
+
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import threading
+import time
+import warnings
+from collections import deque
+from contextlib import contextmanager
+
+PROFILE_ENV = "AEROCONNECT_PROFILE"
+PROFILE_DIR_ENV = "AEROCONNECT_PROFILE_DIR"
+FIT_FIELDS = ["wall_s", "cpu_s", "iterations", "fcalls", "converged", "warnings"]
+MEMORY_FIELDS = ["rss_delta_mb", "peak_growth_mb"]
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB (None where it cannot be read)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 2**20
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where it cannot be read)."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+
+def fit_info(fitted):
+    """Optimizer iterations, function calls and convergence of a fitted SARIMAX result."""
+    retvals = getattr(fitted, "mle_retvals", None) or {}
+    return {
+        "iterations": retvals.get("iterations"),
+        "fcalls": retvals.get("fcalls"),
+        "converged": retvals.get("converged"),
+        "warnflag": retvals.get("warnflag"),
+    }
+
+
+def fit_summary(record):
+    """The fit fields of a sarima_fit record, for metrics files."""
+    return {field: record.get(field) for field in FIT_FIELDS} if record else {}
+
+
+def profile_requested(name):
+    wanted = os.environ.get(PROFILE_ENV, "")
+    names = {part.strip() for part in wanted.split(",") if part.strip()}
+    return "all" in names or name in names
+
+
+def write_profile(profiler, name, profile_dir=None, top=30):
+    """Dump a cProfile run to <name>_<time>.prof and a .txt summary; returns the .prof path."""
+    profile_dir = profile_dir or os.environ.get(PROFILE_DIR_ENV, os.path.join("Outputs", "profiles"))
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}")
+    profiler.dump_stats(base + ".prof")
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+    return base + ".prof"
+
+
+class Recorder:
+    """
+    Records of finished stages for one process.
+
+    Parameters:
+    - max_records: Newest individual records kept (totals cover every record)
+    """
+
+    def __init__(self, max_records=10_000):
+        self.records = deque(maxlen=max_records)
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def collect(self):
+        """Yield a list that receives every record this thread adds inside the block."""
+        collected = []
+        collectors = self.local.__dict__.setdefault("collectors", [])
+        collectors.append(collected)
+        try:
+            yield collected
+        finally:
+            collectors.remove(collected)
+
+    def merge(self, records):
+        """Add records produced elsewhere, e.g. returned by a worker process."""
+        for record in records:
+            self.add(record)
+
+    def active_labels(self):
+        stack = getattr(self.local, "stack", None)
+        return dict(stack[-1]) if stack else {}
+
+    def add(self, record):
+        for collected in getattr(self.local, "collectors", ()):
+            collected.append(record)
+        with self.lock:
+            self.records.append(record)
+            total = self.totals.setdefault(record["stage"], {
+                "runs": 0, "failures": 0, "wall_s": 0.0, "cpu_s": 0.0, "wall_s_max": 0.0,
+                "warnings": 0, "iterations": 0, "not_converged": 0, "peak_growth_mb_max": 0.0})
+            total["runs"] += 1
+            total["failures"] += record["status"] != "ok"
+            total["wall_s"] += record["wall_s"]
+            total["cpu_s"] += record["cpu_s"]
+            total["wall_s_max"] = max(total["wall_s_max"], record["wall_s"])
+            total["warnings"] += record["warnings"]
+            total["iterations"] += record.get("iterations") or 0
+            total["not_converged"] += record.get("converged") is False
+            total["peak_growth_mb_max"] = max(total["peak_growth_mb_max"], record.get("peak_growth_mb") or 0.0)
+
+    @contextmanager
+    def stage(self, name, profile=None, capture_warnings=True, **labels):
+        """Time the block as stage name; yields the record dict so the block can add fields."""
+        labels = {**self.active_labels(), **{k: str(v) for k, v in labels.items()}}
+        record = {"stage": name, "labels": labels, "status": "ok", "warnings": 0}
+        stack = self.local.__dict__.setdefault("stack", [])
+        stack.append(labels)
+        wants_profile = profile if profile is not None else profile_requested(name)
+        # only one profiler can be active; a stage nested in a profiled stage is already covered
+        profiler = cProfile.Profile() if wants_profile and not getattr(self.local, "profiling", False) else None
+        caught = []
+        catcher = warnings.catch_warnings(record=True) if capture_warnings else None
+        start_rss, start_peak = current_rss_mb(), peak_rss_mb()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        record["started_at"] = time.time()
+        try:
+            if catcher is not None:
+                caught = catcher.__enter__()
+                warnings.simplefilter("always")
+            if profiler is not None:
+                self.local.profiling = True
+                profiler.enable()
+            yield record
+        except BaseException as exc:
+            record.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.local.profiling = False
+                record["profile"] = write_profile(profiler, name)
+            if catcher is not None:
+                catcher.__exit__(None, None, None)
+            record["wall_s"] = time.perf_counter() - start_wall
+            record["cpu_s"] = time.process_time() - start_cpu
+            end_rss, end_peak = current_rss_mb(), peak_rss_mb()
+            record["rss_delta_mb"] = None if start_rss is None or end_rss is None else end_rss - start_rss
+            record["peak_growth_mb"] = None if start_peak is None or end_peak is None else end_peak - start_peak
+            record["warnings"] += len(caught)  # the block may already have counted warnings it caught itself
+            if caught:
+                record["warning_types"] = sorted({w.category.__name__ for w in caught})
+                # hand the warnings on to whoever is listening outside the stage
+                for w in caught:
+                    warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+            stack.pop()
+            self.add(record)
+
+    def to_json(self, path=None):
+        """Records and per-stage totals as a JSON-ready dict (also written to path if given)."""
+        with self.lock:
+            payload = {"pid": os.getpid(), "peak_rss_mb": peak_rss_mb(),
+                       "totals": {k: dict(v) for k, v in self.totals.items()}, "records": list(self.records)}
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2, default=str)
+        return payload
+
+    def to_prometheus(self, path=None, prefix="aeroconnect"):
+        """Per-stage totals in the Prometheus text exposition format."""
+        metrics = [
+            ("stage_runs_total", "counter", "Finished runs of a stage", "runs"),
+            ("stage_failures_total", "counter", "Runs of a stage that raised", "failures"),
+            ("stage_wall_seconds_total", "counter", "Wall-clock seconds spent in a stage", "wall_s"),
+            ("stage_cpu_seconds_total", "counter", "CPU seconds spent in a stage", "cpu_s"),
+            ("stage_wall_seconds_max", "gauge", "Slowest single run of a stage", "wall_s_max"),
+            ("stage_warnings_total", "counter", "Warnings raised inside a stage", "warnings"),
+            ("sarima_iterations_total", "counter", "Optimizer iterations of SARIMAX fits in a stage", "iterations"),
+            ("sarima_not_converged_total", "counter", "SARIMAX fits that did not converge", "not_converged"),
+            ("stage_peak_growth_mb_max", "gauge", "Largest rise of the process peak RSS (MB) during one run of a stage",
+             "peak_growth_mb_max"),
+        ]
+        with self.lock:
+            totals = {k: dict(v) for k, v in self.totals.items()}
+        lines = []
+        for metric, kind, help_text, field in metrics:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for stage_name, total in sorted(totals.items()):
+                lines.append(f'{prefix}_{metric}{{stage="{stage_name}"}} {float(total[field]):g}')
+        rss = peak_rss_mb()
+        if rss is not None:
+            lines.append(f"# HELP {prefix}_peak_rss_bytes Peak resident set size of the process")
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {rss * 2**20:.0f}")
+        text = "\n".join(lines) + "\n"
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+
+RECORDER = Recorder()
+
+
+def stage(name, **kwargs):
+    """RECORDER.stage; see Recorder.stage."""
+    return RECORDER.stage(name, **kwargs)
+
+
+def call_collected(func, *args, **kwargs):
+    """
+    Run func in a pool worker; returns (result, records it produced) for RECORDER.merge.
+
+    If func raises, the records are attached to the exception as instrument_records.
+    """
+    with RECORDER.collect() as records:
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            exc.instrument_records = records
+            raise
+    return result, records
+
+
+def map_collected(pool, func, *iterables):
+    """List of pool.map(func, *iterables) results, with the workers' records merged into RECORDER."""
+    results = []
+    try:
+        for result, records in pool.map(call_collected, itertools.repeat(func), *iterables):
+            RECORDER.merge(records)
+            results.append(result)
+    except Exception as exc:
+        RECORDER.merge(getattr(exc, "instrument_records", ()))
+        raise
+    return results
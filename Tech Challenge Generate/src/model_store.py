@@ -0,0 +1,149 @@
+"""
+On-disk cache of fitted SARIMA parameters, one JSON file per entry.
+
+Entries are keyed by route, model order and the first training month. When a
+route's training series grows by a few months, the stored parameters are
+reused instead of re-optimizing from scratch:
+- extend: apply the stored params to the longer series (Kalman filter only)
+- warm: re-optimize, starting from the stored params with few iterations
+- cold: full fit_sarima, as without a cache
+
+RefitPolicy decides which one runs. If the months already covered by an entry
+have changed (data restated), the entry is refitted cold.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+import forecast
+
+DEFAULT_CACHE_DIR = os.path.join("Outputs", "models", "sarima_cache")
+
+
+class RefitPolicy:
+    """
+    When to extend, warm-start or fully refit a cached model.
+
+    - warm_after_obs: new months since the last optimizer run before a warm refit
+    - cold_after_obs: new months since the last cold fit before a full refit
+    - max_age_days: force a full refit when the last cold fit is older than this
+    - warm_maxiter: optimizer iterations for a warm refit
+    """
+
+    def __init__(self, warm_after_obs=3, cold_after_obs=24, max_age_days=90, warm_maxiter=10):
+        self.warm_after_obs = warm_after_obs
+        self.cold_after_obs = cold_after_obs
+        self.max_age_days = max_age_days
+        self.warm_maxiter = warm_maxiter
+
+    def action(self, entry, new_obs, now):
+        """Return "extend", "warm" or "cold" for a cached entry and new_obs extra months."""
+        if now - entry["cold_fit_at"] > self.max_age_days * 86400:
+            return "cold"
+        if entry["nobs"] + new_obs - entry["cold_fit_nobs"] >= self.cold_after_obs:
+            return "cold"
+        if entry["nobs"] + new_obs - entry["fit_nobs"] >= self.warm_after_obs:
+            return "warm"
+        return "extend"
+
+
+def series_hash(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes()).hexdigest()
+
+
+class ModelStore:
+    """Fitted SARIMA parameters cached under cache_dir."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, policy=None, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12)):
+        self.cache_dir = cache_dir
+        self.policy = policy or RefitPolicy()
+        self.order = tuple(order)
+        self.seasonal_order = tuple(seasonal_order)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, route_key, train_start, order=None, seasonal_order=None):
+        key = json.dumps({
+            "route": list(route_key) if isinstance(route_key, tuple) else route_key,
+            "order": list(order or self.order),
+            "seasonal_order": list(seasonal_order or self.seasonal_order),
+            "train_start": str(pd.Timestamp(train_start).date()),
+        }, sort_keys=True)
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, path, entry):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def fit(self, route_key, train, order=None, seasonal_order=None, return_record=False):
+        """
+        Return (fitted results, action) for train, using and updating the cache.
+
+        action is "hit" (same data as cached), "extend", "warm" or "cold".
+        With return_record=True also returns the instrument record of the
+        optimizer run (None for "hit" and "extend").
+        """
+        order = tuple(order or self.order)
+        seasonal_order = tuple(seasonal_order or self.seasonal_order)
+        path = self.entry_path(route_key, train.index[0], order, seasonal_order)
+        entry = self.load(path)
+        now = time.time()
+        values = train.to_numpy(dtype=float)
+
+        action = "cold"
+        if entry is not None and len(values) >= entry["nobs"] and series_hash(values[:entry["nobs"]]) == entry["data_hash"]:
+            new_obs = len(values) - entry["nobs"]
+            action = "hit" if new_obs == 0 else self.policy.action(entry, new_obs, now)
+
+        record = None
+        if action in ("hit", "extend"):
+            fitted = forecast.filter_sarima(train, np.asarray(entry["params"]), order=order, seasonal_order=seasonal_order)
+        elif action == "warm":
+            fitted, record = forecast.fit_sarima(train, order=order, seasonal_order=seasonal_order,
+                                                 start_params=np.asarray(entry["params"]),
+                                                 maxiter=self.policy.warm_maxiter, return_record=True)
+        else:
+            fitted, record = forecast.fit_sarima(train, order=order, seasonal_order=seasonal_order, return_record=True)
+
+        if action == "cold":
+            entry = {"route": list(route_key) if isinstance(route_key, tuple) else route_key,
+                     "order": list(order), "seasonal_order": list(seasonal_order),
+                     "train_start": str(train.index[0].date()),
+                     "cold_fit_at": now, "cold_fit_nobs": len(values)}
+        if action in ("cold", "warm"):
+            entry.update(params=[float(v) for v in fitted.params], param_names=list(fitted.model.param_names),
+                         fit_nobs=len(values))
+        entry.update(nobs=len(values), train_end=str(train.index[-1].date()),
+                     data_hash=series_hash(values), last_used=now)
+        self.save(path, entry)
+        return (fitted, action, record) if return_record else (fitted, action)
+
+    def evict(self, max_idle_days=180, max_entries=None):
+        """Delete entries unused for max_idle_days, then the least recently used beyond max_entries."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in glob.glob(os.path.join(self.cache_dir, "*.json")):
+            entry = self.load(path)
+            if entry is None or now - entry.get("last_used", 0) > max_idle_days * 86400:
+                os.remove(path)
+                removed += 1
+            else:
+                entries.append((entry["last_used"], path))
+        if max_entries is not None and len(entries) > max_entries:
+            entries.sort()
+            for _, path in entries[:len(entries) - max_entries]:
+                os.remove(path)
+                removed += 1
+        return removed
@@ -0,0 +1,229 @@
+"""
+Automatic SARIMA order selection per route.
+
+Instead of always using (1,1,1)(1,1,1,12), a stepwise search starts there and
+moves to the best neighbouring spec (p, q, P, Q +/- 1) until no neighbour
+improves. Each round is pruned: every neighbour gets a cheap low-iteration
+pre-fit in parallel, and only the best few get a full fit.
+Specs are ranked by AIC or by the MAPE on a short holdout.
+
+Chosen orders are cached per route in Outputs/models/order_cache.json and
+reused by later runs until they expire. Updates to the cache are made under a
+file lock and written atomically, so concurrent runs do not lose entries.
+select_orders() searches many routes with one process pool.
+"""
+
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import forecast
+import instrument
+from batch_forecast import limit_blas_threads
+
+DEFAULT_START = ((1, 1, 1), (1, 1, 1, 12))
+DEFAULT_CACHE_PATH = os.path.join("Outputs", "models", "order_cache.json")
+
+
+def score_spec(ts, spec, criterion="aic", maxiter=None, holdout=6):
+    """Score one (order, seasonal_order) spec; lower is better, inf on failure."""
+    if criterion not in ("aic", "backtest"):
+        raise ValueError(f"Unknown criterion {criterion}; use aic or backtest")
+    order, seasonal_order = spec
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            if criterion == "aic":
+                fitted = forecast.fit_sarima(ts, order=order, seasonal_order=seasonal_order, maxiter=maxiter)
+                score = float(fitted.aic)
+            else:
+                train, test = ts.iloc[:-holdout], ts.iloc[-holdout:]
+                fitted = forecast.fit_sarima(train, order=order, seasonal_order=seasonal_order, maxiter=maxiter)
+                preds = np.asarray(fitted.forecast(steps=holdout))
+                actual = test.to_numpy(dtype=float)
+                score = float(np.mean(np.abs(actual - preds) / np.maximum(actual, 1)) * 100.0)
+        except Exception:
+            return spec, float("inf")
+    return spec, score if np.isfinite(score) else float("inf")
+
+
+def neighbours(spec, vary_differencing=False, max_p=3, max_q=3, max_P=2, max_Q=2):
+    """
+    Specs one step away: p, q, P, Q +/- 1 and, with vary_differencing, d or D
+    switched between 0 and 1 (AIC is not comparable across differencing orders,
+    so that is only used with the backtest criterion).
+    """
+    (p, d, q), (P, D, Q, s) = spec
+    found = []
+    for dp, dq, dP, dQ in [(1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0),
+                           (0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1),
+                           (1, 1, 0, 0), (-1, -1, 0, 0)]:
+        cand = (p + dp, q + dq, P + dP, Q + dQ)
+        if 0 <= cand[0] <= max_p and 0 <= cand[1] <= max_q and 0 <= cand[2] <= max_P and 0 <= cand[3] <= max_Q:
+            found.append(((cand[0], d, cand[1]), (cand[2], D, cand[3], s)))
+    if vary_differencing:
+        found.append(((p, 1 - d, q), (P, D, Q, s)))
+        found.append(((p, d, q), (P, 1 - D, Q, s)))
+    return found
+
+
+def stepwise_search(ts, start=DEFAULT_START, criterion="aic", prefit_maxiter=15, full_keep=3,
+                    max_rounds=6, workers=None, holdout=6, pool=None, **bounds):
+    """
+    Stepwise order search for one series.
+
+    Parameters:
+    - start: First spec, ((p,d,q), (P,D,Q,s))
+    - criterion: "aic" or "backtest" (holdout MAPE on the last `holdout` months)
+    - prefit_maxiter: Optimizer iterations for the cheap pre-fits used for pruning
+    - full_keep: How many pre-fitted neighbours per round get a full fit
+    - workers: Processes for scoring candidates in parallel
+    - pool: Executor to use instead of starting one (workers is then ignored)
+
+    Returns (best spec, best score, number of specs evaluated).
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads) as pool:
+            return stepwise_search(ts, start=start, criterion=criterion, prefit_maxiter=prefit_maxiter,
+                                   full_keep=full_keep, max_rounds=max_rounds, holdout=holdout, pool=pool, **bounds)
+
+    start = (tuple(start[0]), tuple(start[1]))
+    # the first round's neighbours do not depend on the start's score, so it is fitted alongside their pre-fits
+    start_future = pool.submit(instrument.call_collected, score_spec, ts, start, criterion, None, holdout)
+
+    def start_score():
+        (_, score), records = start_future.result()
+        instrument.RECORDER.merge(records)
+        return score
+
+    best_spec, best_score = start, None
+    seen = {start}
+    for _ in range(max_rounds):
+        candidates = [spec for spec in neighbours(best_spec, vary_differencing=criterion == "backtest", **bounds)
+                      if spec not in seen]
+        seen.update(candidates)
+        n = len(candidates)
+        prefits = instrument.map_collected(pool, score_spec, [ts] * n, candidates, [criterion] * n,
+                                           [prefit_maxiter] * n, [holdout] * n)
+        if best_score is None:
+            best_score = start_score()
+        prefits = sorted((item for item in prefits if np.isfinite(item[1])), key=lambda item: item[1])[:full_keep]
+        if not prefits:
+            break
+        shortlisted = [spec for spec, _ in prefits]
+        k = len(shortlisted)
+        full = instrument.map_collected(pool, score_spec, [ts] * k, shortlisted, [criterion] * k, [None] * k,
+                                        [holdout] * k)
+        round_spec, round_score = min(full, key=lambda item: item[1])
+        if round_score >= best_score:
+            break
+        best_spec, best_score = round_spec, round_score
+    if best_score is None:
+        best_score = start_score()
+    return best_spec, best_score, len(seen)
+
+
+def route_cache_key(route_key):
+    return " | ".join(route_key) if isinstance(route_key, (tuple, list)) else str(route_key)
+
+
+def load_order_cache(cache_path=DEFAULT_CACHE_PATH):
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_order_cache(cache, cache_path=DEFAULT_CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+@contextmanager
+def cache_lock(cache_path=DEFAULT_CACHE_PATH):
+    """Exclusive lock on cache_path (a .lock file next to it) across processes."""
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with open(cache_path + ".lock", "a+b") as lock_file:
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            import msvcrt
+
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def update_order_cache(key, entry, cache_path=DEFAULT_CACHE_PATH):
+    """Set one route's entry; the read-modify-write holds the cache lock so concurrent runs keep theirs."""
+    with cache_lock(cache_path):
+        cache = load_order_cache(cache_path)
+        cache[key] = entry
+        save_order_cache(cache, cache_path)
+
+
+def cached_order(route_key, cache_path=DEFAULT_CACHE_PATH, default=DEFAULT_START):
+    """Cached (order, seasonal_order) for a route, or default when none is cached."""
+    entry = load_order_cache(cache_path).get(route_cache_key(route_key))
+    if entry is None:
+        return default
+    return tuple(entry["order"]), tuple(entry["seasonal_order"])
+
+
+def select_order(route_key, ts, cache_path=DEFAULT_CACHE_PATH, max_age_days=90, force=False, **search_kwargs):
+    """
+    Order for a route: the cached one if it is recent enough, otherwise a new stepwise search.
+
+    Returns ((order, seasonal_order), from_cache).
+    """
+    cache = load_order_cache(cache_path)
+    key = route_cache_key(route_key)
+    entry = cache.get(key)
+    if entry is not None and not force and time.time() - entry["searched_at"] <= max_age_days * 86400:
+        return (tuple(entry["order"]), tuple(entry["seasonal_order"])), True
+
+    spec, score, evaluated = stepwise_search(ts, **search_kwargs)
+    update_order_cache(key, {
+        "order": list(spec[0]),
+        "seasonal_order": list(spec[1]),
+        "score": score,
+        "criterion": search_kwargs.get("criterion", "aic"),
+        "evaluated": evaluated,
+        "nobs": len(ts),
+        "searched_at": time.time(),
+    }, cache_path)
+    return spec, False
+
+
+def select_orders(series, cache_path=DEFAULT_CACHE_PATH, max_age_days=90, force=False, workers=None,
+                  **search_kwargs):
+    """
+    select_order for many routes, sharing one process pool.
+
+    Parameters:
+    - series: Iterable of (route_key, ts)
+    - workers: Processes for scoring candidates
+
+    Yields (route_key, (order, seasonal_order), from_cache) as each route finishes.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads) as pool:
+        for route_key, ts in series:
+            spec, from_cache = select_order(route_key, ts, cache_path=cache_path, max_age_days=max_age_days,
+                                            force=force, pool=pool, **search_kwargs)
+            yield route_key, spec, from_cache
@@ -0,0 +1,261 @@
+"""
+Cached clean -> forecast -> plot pipeline.
+
+Each stage declares its input files (data and the source modules it runs),
+its parameters and its output files. A stage's fingerprint is a hash of all
+of those inputs' contents plus the parameters; a stage is skipped when the
+fingerprint matches the last successful run and its outputs still exist.
+Stages whose dependencies are done run concurrently in separate processes
+(forecast and plot both only need the cleaned data).
+
+Every run is recorded in Outputs/pipeline_manifest.json (with each stage's
+wall and CPU seconds, memory and warning count from instrument.py), which
+also keeps file hashes keyed by size and mtime so unchanged files are not re-read.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import instrument
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = "pipeline_manifest.json"
+MAX_RUNS_KEPT = 20
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Parameters:
+    - name: Stage name, used in the manifest
+    - func: Module-level function called as func(**params) in a worker process
+    - inputs: Files or folders whose contents the stage depends on
+    - outputs: Files or folders the stage writes
+    - params: Keyword arguments for func (part of the fingerprint)
+    - after: Names of stages that must finish first
+    """
+
+    def __init__(self, name, func, inputs, outputs, params=None, after=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.after = list(after)
+
+
+def run_clean(csv_path, outputs_dir, extra_features=None):
+    import data_prep
+
+    data_prep.clean_and_enrich(csv_path, outputs_dir, extra_features=extra_features)
+
+
+def run_forecast(outputs_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    import forecast
+
+    forecast.main(outputs_dir=outputs_dir)
+
+
+def run_plot(outputs_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    import visualize
+
+    visualize.main(outputs_dir=outputs_dir)
+
+
+def source(*modules):
+    # pipeline.py itself is an input of every stage: it holds the run_* wrappers
+    return [os.path.join(SRC_DIR, f"{module}.py") for module in modules + ("pipeline",)]
+
+
+def default_stages(csv_path="TechChallenge_Data.csv", outputs_dir="Outputs", extra_features=None):
+    """The clean, forecast and plot stages of this project."""
+    cleaned = os.path.join(outputs_dir, "clean", "cleaned_data")
+    models = os.path.join(outputs_dir, "models")
+    figures = os.path.join(outputs_dir, "figures")
+    return [
+        Stage("clean", run_clean,
+              inputs=[csv_path] + source("data_prep", "features", "instrument", "store"),
+              outputs=[cleaned, os.path.join(outputs_dir, "clean", "route_stats.parquet")],
+              params={"csv_path": csv_path, "outputs_dir": outputs_dir, "extra_features": extra_features}),
+        Stage("forecast", run_forecast,
+              inputs=[cleaned] + source("forecast", "instrument", "route_index", "store"),
+              outputs=[os.path.join(models, "syd_akl_sarima_metrics.json"),
+                       os.path.join(models, "melbourne_singapore_future_twelve.csv"),
+                       os.path.join(figures, "mel_sin_actual_pred.png")],
+              params={"outputs_dir": outputs_dir}, after=["clean"]),
+        Stage("plot", run_plot,
+              inputs=[cleaned] + source("visualize", "store"),
+              outputs=[os.path.join(figures, name) for name in
+                       ["top_routes.png", "bottom_routes.png", "continent_share.png", "time_series.png"]],
+              params={"outputs_dir": outputs_dir}, after=["clean"]),
+    ]
+
+
+def file_hash(path, known):
+    """sha256 of a file, reusing known[path] while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    entry = known.get(path)
+    if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    known[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    return known[path]["sha256"]
+
+
+def path_hash(path, known):
+    """Hash of a file, or of every file under a folder (names and contents); "missing" if absent."""
+    if os.path.isfile(path):
+        return file_hash(path, known)
+    if not os.path.isdir(path):
+        return "missing"
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            digest.update(os.path.relpath(full, path).encode("utf-8"))
+            digest.update(file_hash(full, known).encode("ascii"))
+    return digest.hexdigest()
+
+
+def fingerprint(stage, known):
+    digest = hashlib.sha256(stage.name.encode("utf-8"))
+    digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode("utf-8"))
+    for path in stage.inputs:
+        digest.update(path.encode("utf-8"))
+        digest.update(path_hash(path, known).encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"stages": {}, "file_hashes": {}, "runs": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def timed_call(name, func, params):
+    """Run a stage in a worker; returns its instrument record (wall/CPU seconds, memory, warnings)."""
+    with instrument.stage(name) as record:
+        func(**params)
+    return {key: record[key] for key in ["wall_s", "cpu_s", "warnings"] + instrument.MEMORY_FIELDS}
+
+
+def run_pipeline(stages, manifest_path, force=(), dry_run=False, workers=None):
+    """
+    Run the stages in dependency order, skipping up-to-date ones.
+
+    Parameters:
+    - force: Stage names to run even if up to date (True for all)
+    - dry_run: Only report which stages would run
+    - workers: Processes for stages that can run at the same time
+
+    Returns {stage name: status}, where status is skipped, ran, would_run,
+    failed or blocked (a dependency failed).
+    """
+    by_name = {stage.name: stage for stage in stages}
+    if force is not True:
+        unknown = [name for name in force if name not in by_name]
+        if unknown:
+            raise ValueError(f"Cannot force unknown stages {unknown}; choose from {list(by_name)}")
+    for stage in stages:
+        missing = [name for name in stage.after if name not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+
+    manifest = load_manifest(manifest_path)
+    known = manifest["file_hashes"]
+    status = {}
+    run = {"started_at": time.time(), "stages": {}}
+    pending = list(stages)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending:
+            ready = [stage for stage in pending if all(name in status for name in stage.after)]
+            if not ready:
+                raise ValueError(f"Dependency cycle among {[stage.name for stage in pending]}")
+            pending = [stage for stage in pending if stage not in ready]
+
+            futures = {}
+            for stage in ready:
+                if any(status[name] in ("failed", "blocked") for name in stage.after):
+                    status[stage.name] = "blocked"
+                    continue
+                current = fingerprint(stage, known)
+                previous = manifest["stages"].get(stage.name, {})
+                # a rerun upstream stage that rewrote identical files does not invalidate this one;
+                # in a dry run the upstream outputs are not rewritten yet, so assume they change
+                upstream_pending = any(status[name] == "would_run" for name in stage.after)
+                up_to_date = (previous.get("fingerprint") == current and not upstream_pending
+                              and all(os.path.exists(path) for path in stage.outputs))
+                if up_to_date and not (force is True or stage.name in force):
+                    status[stage.name] = "skipped"
+                elif dry_run:
+                    status[stage.name] = "would_run"
+                else:
+                    # forget the last success first, so a failed rerun is not reported as up to date
+                    manifest["stages"].pop(stage.name, None)
+                    futures[stage.name] = pool.submit(instrument.call_collected, timed_call, stage.name, stage.func,
+                                                      stage.params)
+                run["stages"][stage.name] = {"fingerprint": current}
+
+            for name, future in futures.items():
+                stage = by_name[name]
+                try:
+                    timing, records = future.result()
+                except Exception as exc:
+                    instrument.RECORDER.merge(getattr(exc, "instrument_records", ()))
+                    status[name] = "failed"
+                    run["stages"][name].update(error=f"{type(exc).__name__}: {exc}")
+                    print(f"Stage {name} failed: {type(exc).__name__}: {exc}")
+                    continue
+                instrument.RECORDER.merge(records)
+                status[name] = "ran"
+                seconds = round(timing["wall_s"], 3)
+                run["stages"][name].update(seconds=seconds, cpu_seconds=round(timing["cpu_s"], 3),
+                                           rss_delta_mb=timing["rss_delta_mb"],
+                                           peak_growth_mb=timing["peak_growth_mb"], warnings=timing["warnings"])
+                # fingerprint again: a stage may rewrite files it also reads (e.g. the store)
+                manifest["stages"][name] = {
+                    "fingerprint": fingerprint(stage, known),
+                    "finished_at": time.time(),
+                    "seconds": seconds,
+                    "outputs": stage.outputs,
+                }
+
+    for name, state in status.items():
+        run["stages"].setdefault(name, {})["status"] = state
+    run["finished_at"] = time.time()
+    if not dry_run:
+        manifest["runs"] = (manifest["runs"] + [run])[-MAX_RUNS_KEPT:]
+        save_manifest(manifest, manifest_path)
+    return status
+
+
+def main(csv_path="TechChallenge_Data.csv", outputs_dir="Outputs", extra_features=None, force=(), dry_run=False,
+         workers=None):
+    stages = default_stages(csv_path, outputs_dir, extra_features=extra_features)
+    return run_pipeline(stages, os.path.join(outputs_dir, MANIFEST_NAME), force=force, dry_run=dry_run,
+                        workers=workers)
+
+
+if __name__ == "__main__":
+    print(main())
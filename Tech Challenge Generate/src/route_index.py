@@ -0,0 +1,79 @@
+"""
+Dense dates x routes matrix built once from the cleaned data.
+
+Fetching one route's monthly series is then a column slice instead of a
+boolean scan over the whole frame. The matrix is stored column-major, so
+each route's series is contiguous and handed out as a zero-copy view. The
+matrix is read-only, so modifying a returned series in place raises instead
+of corrupting every later series() and aggregate() call; .copy() it first.
+
+Months inside a route's first..last observed month with no rows are 0
+passengers; months outside that span are not part of the route's series.
+"""
+
+import numpy as np
+import pandas as pd
+
+ROUTE_KEY = ["australian_port", "country", "foreign_port"]
+
+
+class RouteIndex:
+    """
+    Route-series index over one value column (default passengers_total).
+
+    Attributes:
+    - dates: DatetimeIndex of every month in the data (the matrix rows)
+    - matrix: read-only float array (dates x routes), column-major
+    - routes: DataFrame with one row per matrix column (port, country, foreign port, route, continent)
+    """
+
+    def __init__(self, df, value="passengers_total"):
+        date_codes, self.dates = pd.factorize(df["date"], sort=True)
+        self.dates = pd.DatetimeIndex(self.dates, name="date")
+        key_frame = df[ROUTE_KEY].astype(str)
+        route_codes, keys = pd.factorize(pd.MultiIndex.from_frame(key_frame), sort=True)
+        n_dates, n_routes = len(self.dates), len(keys)
+
+        flat = route_codes.astype(np.int64) * n_dates + date_codes
+        values = df[value].to_numpy(dtype=float)
+        totals = np.bincount(flat, weights=values, minlength=n_dates * n_routes)
+        counts = np.bincount(flat, minlength=n_dates * n_routes)
+        # (routes, dates) in C order transposed = (dates, routes) in Fortran order
+        self.matrix = totals.reshape(n_routes, n_dates).T
+        self.matrix.flags.writeable = False
+        present = counts.reshape(n_routes, n_dates) > 0
+        self.first = present.argmax(axis=1)
+        self.last = n_dates - 1 - present[:, ::-1].argmax(axis=1)
+
+        self.routes = keys.to_frame(index=False, name=ROUTE_KEY)
+        self.routes["route"] = self.routes["australian_port"] + " → " + self.routes["foreign_port"]
+        if "continent" in df.columns:
+            continent = df.groupby(route_codes)["continent"].first().astype(str)
+            self.routes["continent"] = continent.to_numpy()
+        self.lookup = {tuple(key): col for col, key in enumerate(keys)}
+
+    def column_for(self, australian_port, country, foreign_port):
+        """Matrix column of a route, or None if the route is not in the data."""
+        return self.lookup.get((australian_port, country, foreign_port))
+
+    def series_at(self, col):
+        """Monthly series for matrix column col (a read-only view on the matrix)."""
+        start, stop = self.first[col], self.last[col] + 1
+        key = self.routes.iloc[col]
+        return pd.Series(self.matrix[start:stop, col], index=self.dates[start:stop], name=key["route"], copy=False)
+
+    def series(self, australian_port, country, foreign_port):
+        """Monthly series for a route (empty if the route is not in the data)."""
+        col = self.column_for(australian_port, country, foreign_port)
+        if col is None:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([], name="date"))
+        return self.series_at(col)
+
+    def aggregate(self, level):
+        """Dates x groups totals for level in australian_port, country, continent."""
+        if level not in self.routes.columns:
+            raise ValueError(f"Unknown level {level}; choose australian_port, country or continent")
+        group_codes, groups = pd.factorize(self.routes[level], sort=True)
+        indicator = np.zeros((len(self.routes), len(groups)))
+        indicator[np.arange(len(self.routes)), group_codes] = 1.0
+        return pd.DataFrame(self.matrix @ indicator, index=self.dates, columns=pd.Index(groups, name=level))
@@ -0,0 +1,224 @@
+"""
+Local forecast service: an in-process API plus a small HTTP/JSON server.
+
+    GET /forecast?route=Perth → Singapore&horizon=12&train_end=1989-06-01
+    GET /health
+    GET /metrics   (Prometheus text: SARIMA fit times, iterations, convergence)
+
+route is either the route name ("Perth → Singapore") or the full key
+"Perth|Singapore|Singapore". train_end defaults to the route's last month; other
+values are moved to their month start and must lie within the route's data.
+
+ForecastService keeps two LRU caches with a time-to-live:
+- fitted SARIMA params per (route, train_end), so a new horizon only needs a
+  Kalman filter pass
+- finished forecasts per (route, train_end, horizon)
+Identical requests that arrive while a fit is running share that fit, and
+fits run in a process pool so the asyncio server keeps answering.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+import forecast
+import instrument
+from batch_forecast import limit_blas_threads
+
+
+def fit_and_forecast(ts, train_end, horizon, params=None):
+    """Worker task: fit (or reuse params) on ts up to train_end, forecast horizon months."""
+    train = ts[:train_end]
+    if len(train) == 0:
+        raise ValueError(f"No data up to {train_end}")
+    fit_record = None
+    if params is None:
+        fitted, fit_record = forecast.fit_sarima(train, return_record=True)
+    else:
+        fitted = forecast.filter_sarima(train, np.asarray(params))
+    future = forecast.dated_forecast(fitted, train_end, horizon)
+    return [float(v) for v in fitted.params], [(str(d.date()), float(v)) for d, v in future.items()], fit_record
+
+
+class TTLCache:
+    """Small LRU cache whose entries also expire after ttl seconds (not thread-safe on its own)."""
+
+    def __init__(self, max_size=256, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items = OrderedDict()
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self.items[key]
+            return None
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = (time.monotonic() + self.ttl, value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+
+class ForecastService:
+    """
+    Forecasts for any route of a RouteIndex, cached and coalesced.
+
+    Use forecast(...) from Python or serve_http(...) for the HTTP API.
+    """
+
+    def __init__(self, index, workers=2, cache_size=256, ttl=3600):
+        self.index = index
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=limit_blas_threads)
+        self.models = TTLCache(cache_size, ttl)
+        self.forecasts = TTLCache(cache_size, ttl)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.by_name = {}
+        for col, row in enumerate(self.index.routes.itertuples(index=False)):
+            self.by_name.setdefault(row.route, []).append(col)
+
+    def resolve(self, route):
+        """Matrix column for a route name or "port|country|foreign_port" key."""
+        if "|" in route:
+            col = self.index.column_for(*[part.strip() for part in route.split("|")])
+            if col is None:
+                raise KeyError(f"Unknown route {route}")
+            return col
+        cols = self.by_name.get(route.strip())
+        if not cols:
+            raise KeyError(f"Unknown route {route}")
+        if len(cols) > 1:
+            raise ValueError(f"Route {route} exists for several countries; use port|country|foreign_port")
+        return cols[0]
+
+    def submit(self, route, horizon=12, train_end=None):
+        """Return a concurrent Future with the forecast response (dict)."""
+        col = self.resolve(route)
+        ts = self.index.series_at(col)
+        try:
+            horizon = int(horizon)
+        except (TypeError, ValueError):
+            raise ValueError(f"horizon must be an integer, got {horizon!r}")
+        if not 1 <= horizon <= 60:
+            raise ValueError("horizon must be between 1 and 60")
+        if train_end:
+            # month start, so 1989-06-15 and 1989-06-01 share a cache entry
+            train_end = pd.Timestamp(train_end).to_period("M").to_timestamp()
+            if not ts.index.min() <= train_end <= ts.index.max():
+                raise ValueError(f"train_end must be between {ts.index.min().date()} and {ts.index.max().date()}")
+        else:
+            train_end = ts.index.max()
+        key = (col, str(train_end.date()), horizon)
+
+        with self.lock:
+            cached = self.forecasts.get(key)
+            if cached is not None:
+                done = Future()
+                done.set_result(dict(cached, cached=True))
+                return done
+            if key in self.in_flight:
+                return self.in_flight[key]
+            params = self.models.get(key[:2])
+            task = self.pool.submit(fit_and_forecast, ts, train_end, horizon, params)
+            result = Future()
+            self.in_flight[key] = result
+
+        route_name = ts.name
+
+        def finish(task):
+            with self.lock:
+                self.in_flight.pop(key, None)
+                if task.exception() is not None:
+                    result.set_exception(task.exception())
+                    return
+                fitted_params, values, fit_record = task.result()
+                if fit_record is not None:
+                    # fits run in worker processes; keep their records here for /metrics
+                    instrument.RECORDER.add(dict(fit_record, labels={"route": route_name}))
+                response = {
+                    "route": route_name,
+                    "train_end": key[1],
+                    "horizon": horizon,
+                    "forecast": [{"date": d, "predicted_passengers": v} for d, v in values],
+                }
+                self.models.put(key[:2], fitted_params)
+                self.forecasts.put(key, response)
+            result.set_result(dict(response, cached=False))
+
+        task.add_done_callback(finish)
+        return result
+
+    def forecast(self, route, horizon=12, train_end=None):
+        """Blocking in-process API."""
+        return self.submit(route, horizon=horizon, train_end=train_end).result()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def http_response(writer, status, payload):
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n")
+    writer.write(head.encode("ascii") + body)
+
+
+async def handle_request(service, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass  # headers are not needed
+        parts = request_line.split(" ")
+        if len(parts) < 2 or parts[0] != "GET":
+            http_response(writer, 400, {"error": "Only GET is supported"})
+            return
+        url = urlsplit(parts[1])
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/health":
+            http_response(writer, 200, {"status": "ok"})
+        elif url.path == "/metrics":
+            body = instrument.RECORDER.to_prometheus().encode("utf-8")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body)
+        elif url.path == "/forecast":
+            if "route" not in query:
+                http_response(writer, 400, {"error": "route is required"})
+                return
+            try:
+                future = service.submit(query["route"], horizon=query.get("horizon", 12), train_end=query.get("train_end"))
+                payload = await asyncio.wrap_future(future)
+            except KeyError as exc:
+                http_response(writer, 404, {"error": str(exc.args[0])})
+            except ValueError as exc:
+                http_response(writer, 400, {"error": str(exc)})
+            else:
+                http_response(writer, 200, payload)
+        else:
+            http_response(writer, 404, {"error": f"Unknown path {url.path}"})
+    except Exception as exc:  # keep the server alive on unexpected errors
+        http_response(writer, 500, {"error": f"{type(exc).__name__}: {exc}"})
+    finally:
+        await writer.drain()
+        writer.close()
+
+
+async def serve_http(service, host="127.0.0.1", port=8000):
+    """Run the HTTP server until cancelled."""
+    server = await asyncio.start_server(lambda r, w: handle_request(service, r, w), host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,105 @@
+"""
+Read-only dashboard dataset shared by sessions and server processes.
+
+The dashboard's RouteCube (integer-coded cells and metric values, see
+cube.to_arrow) is published as one Arrow IPC file
+(Outputs/clean/dashboard.arrow). Every server process memory-maps that file
+and builds its RouteCube from zero-copy NumPy views of the mapped buffers, so
+the cube's arrays live once in the OS page cache no matter how many processes
+or sessions read them; only the small level lists and per-date arrays are
+private to each process.
+
+Publishing writes a temporary file and os.replace()s it into place, so readers
+never see a half-written snapshot; processes that still map the old file keep
+a valid view of it. SharedDataset.get() notices a new snapshot (or a cleaned
+store newer than the snapshot) and reloads.
+"""
+
+import os
+import threading
+import time
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import cube
+import store
+
+SNAPSHOT_NAME = "dashboard.arrow"
+
+
+def snapshot_path_for(cleaned_path):
+    """Snapshot file next to the cleaned store: Outputs/clean/dashboard.arrow."""
+    return os.path.join(os.path.dirname(os.path.normpath(cleaned_path)), SNAPSHOT_NAME)
+
+
+def store_mtime(cleaned_path):
+    """Newest modification time of the store's part files (0 if there are none)."""
+    return max((os.path.getmtime(part) for part in store.list_parts(cleaned_path)), default=0.0)
+
+
+def publish_snapshot(cleaned_path, snapshot_path=None, columns=cube.CUBE_COLUMNS):
+    """Build the RouteCube of the store and write it to an Arrow IPC file, atomically."""
+    snapshot_path = snapshot_path or snapshot_path_for(cleaned_path)
+    table = cube.RouteCube(store.load_cleaned(cleaned_path, columns=columns)).to_arrow()
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def open_snapshot(snapshot_path):
+    """RouteCube over a memory-mapped snapshot (its arrays are views of the mapping, not copies)."""
+    source = pa.memory_map(snapshot_path, "r")
+    return cube.RouteCube.from_arrow(ipc.open_file(source).read_all())
+
+
+class SharedDataset:
+    """
+    Process-wide RouteCube over a published snapshot, reloaded when it changes.
+
+    Parameters:
+    - cleaned_path: Cleaned store; the snapshot is (re)published from it when missing or older
+    - snapshot_path: Arrow IPC file (default: next to the store)
+    - check_interval: Seconds between checks for a newer snapshot
+    """
+
+    def __init__(self, cleaned_path, snapshot_path=None, check_interval=5.0):
+        self.cleaned_path = cleaned_path
+        self.snapshot_path = snapshot_path or snapshot_path_for(cleaned_path)
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.cube = None
+        self.version = None
+        self.checked_at = 0.0
+
+    def current_version(self):
+        if not os.path.exists(self.snapshot_path) or store_mtime(self.cleaned_path) > os.path.getmtime(self.snapshot_path):
+            publish_snapshot(self.cleaned_path, self.snapshot_path)
+        stat = os.stat(self.snapshot_path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get(self):
+        """The current RouteCube; loads it on first use and after a new snapshot is published."""
+        with self.lock:
+            now = time.monotonic()
+            if self.cube is None or now - self.checked_at >= self.check_interval:
+                version = self.current_version()
+                if version != self.version:
+                    self.cube = open_snapshot(self.snapshot_path)
+                    self.version = version
+                self.checked_at = now
+            return self.cube
+
+
+datasets = {}
+datasets_lock = threading.Lock()
+
+
+def shared_dataset(cleaned_path):
+    """The SharedDataset of this process for a cleaned store."""
+    key = os.path.abspath(cleaned_path)
+    with datasets_lock:
+        if key not in datasets:
+            datasets[key] = SharedDataset(cleaned_path)
+        return datasets[key]
@@ -0,0 +1,145 @@
+"""
+Columnar storage for the cleaned dataset (Parquet via pyarrow).
+
+The cleaned data is kept as a folder of Parquet part files so every tool
+(forecast, visualize, dashboard) can share one loader:
+- Text columns are stored as categoricals (dictionary encoded)
+- `date` stays a real datetime64 column
+- Counts are int32 and tonnes/ratios/z-scores are float32; missing or
+  non-numeric counts are stored as 0 with a warning giving how many
+- Rows are sorted by date and port so row-group statistics let pyarrow
+  skip whole chunks when filtering on date or australian_port
+"""
+
+import glob
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+DEFAULT_STORE = os.path.join("Outputs", "clean", "cleaned_data")
+
+CATEGORY_COLUMNS = [
+    "month_label", "australian_port", "foreign_port", "country",
+    "route", "city_pair", "continent",
+]
+INT_COLUMNS = [
+    "passengers_in", "passengers_out", "passengers_total",
+    "load_balance_diff", "year", "month_num",
+]
+FLOAT_COLUMNS = [
+    "freight_in_tonnes", "mail_in_tonnes", "freight_out_tonnes", "mail_out_tonnes",
+    "freight_total_tonnes", "mail_total_tonnes", "load_balance_ratio", "passengers_total_z",
+    # optional columns from features.py
+    "passengers_rolling_12", "passengers_yoy_growth", "seasonal_index",
+    "load_balance_ratio_12", "load_balance_trend_12",
+]
+
+# Small row groups keep date/port pushdown selective on long histories
+ROW_GROUP_SIZE = 50_000
+
+
+def compact_dtypes(df):
+    """
+    Return a copy of df with categorical text, int32 counts and float32 measures.
+
+    int32 has no missing value, so missing or non-numeric counts become 0; a
+    UserWarning says how many per column so the data problem stays visible.
+    """
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce")
+            missing = values.isna()
+            if missing.any():
+                unparseable = int((missing & df[col].notna()).sum())
+                warnings.warn(f"{col}: {int(missing.sum())} missing or non-numeric values "
+                              f"({unparseable} non-numeric) stored as 0", stacklevel=2)
+            df[col] = values.fillna(0).astype(np.int32)
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            # pd.to_numeric turns pd.NA (e.g. ratio with zero passengers_out) into NaN
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def list_parts(store_dir=DEFAULT_STORE):
+    """List the Parquet part files in the store, oldest first."""
+    return sorted(glob.glob(os.path.join(store_dir, "part-*.parquet")))
+
+
+def stored_columns(store_dir=DEFAULT_STORE):
+    """Column names of the store (from the first part's schema; [] when it is empty)."""
+    parts = list_parts(store_dir)
+    return pq.read_schema(parts[0]).names if parts else []
+
+
+def write_part(df, store_dir, part_name):
+    """Write one sorted, dtype-compact Parquet part into the store folder."""
+    os.makedirs(store_dir, exist_ok=True)
+    df = compact_dtypes(df)
+    sort_cols = [col for col in ["date", "australian_port", "route"] if col in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols, kind="stable")
+    path = os.path.join(store_dir, f"{part_name}.parquet")
+    df.to_parquet(path, index=False, engine="pyarrow", row_group_size=ROW_GROUP_SIZE)
+    return path
+
+
+def write_cleaned(df, store_dir=DEFAULT_STORE):
+    """Replace the whole store with df (used by a full rebuild)."""
+    for path in list_parts(store_dir):
+        os.remove(path)
+    write_part(df, store_dir, "part-00000")
+    return store_dir
+
+
+def append_part(df, store_dir=DEFAULT_STORE):
+    """Add df as a new part after the existing ones (used by incremental loads)."""
+    part_name = f"part-{len(list_parts(store_dir)):05d}"
+    return write_part(df, store_dir, part_name)
+
+
+def build_filters(start=None, end=None, australian_ports=None, routes=None):
+    """Translate simple date/port/route arguments into pyarrow filters."""
+    filters = []
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+    if australian_ports:
+        filters.append(("australian_port", "in", list(australian_ports)))
+    if routes:
+        filters.append(("route", "in", list(routes)))
+    return filters or None
+
+
+def load_cleaned(store_dir=DEFAULT_STORE, columns=None, start=None, end=None,
+                 australian_ports=None, routes=None):
+    """
+    Load the cleaned dataset, reading only what is asked for.
+
+    Parameters:
+    - store_dir: Folder of Parquet parts written by write_cleaned
+    - columns: Optional list of columns to read (column projection)
+    - start, end: Optional inclusive date bounds (pushed down to Parquet)
+    - australian_ports: Optional list of ports to keep (pushed down to Parquet)
+    - routes: Optional list of route names like "Perth → Singapore"
+    """
+    parts = list_parts(store_dir)
+    if not parts:
+        raise FileNotFoundError(f"No cleaned data found in {store_dir}; run the clean step first")
+    filters = build_filters(start=start, end=end, australian_ports=australian_ports, routes=routes)
+    table = pq.read_table(parts, columns=columns, filters=filters)
+    df = table.to_pandas()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            # Drop dictionary entries that the filters removed
+            df[col] = df[col].cat.remove_unused_categories()
+    return df.reset_index(drop=True)
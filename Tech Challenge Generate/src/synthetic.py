@@ -0,0 +1,104 @@
+"""
+Synthetic BITRE-schema data for benchmarks and demos.
+
+generate() builds a raw frame with exactly the columns of the challenge CSV
+(Month, AustralianPort, ..., Year, Month_num) for any number of routes and
+months. Each route gets its own base volume, yearly growth, seasonal phase
+and multiplicative noise, so the cleaning, feature, forecasting and plotting
+code all see realistic-looking series at any scale.
+"""
+
+import numpy as np
+import pandas as pd
+
+AUSTRALIAN_PORTS = ["Sydney", "Melbourne", "Brisbane", "Perth", "Adelaide", "Cairns", "Darwin",
+                    "Gold Coast", "Hobart", "Canberra", "Townsville", "Port Hedland"]
+FOREIGN_PORTS = [
+    ("Auckland", "New Zealand"), ("Christchurch", "New Zealand"), ("Wellington", "New Zealand"),
+    ("Singapore", "Singapore"), ("Kuala Lumpur", "Malaysia"), ("Bangkok", "Thailand"),
+    ("Tokyo", "Japan"), ("Osaka", "Japan"), ("Hong Kong", "Hong Kong"), ("Taipei", "Taiwan"),
+    ("Seoul", "South Korea"), ("Manila", "Philippines"), ("Denpasar", "Indonesia"),
+    ("Jakarta", "Indonesia"), ("Port Moresby", "Papua New Guinea"), ("Nadi", "Fiji"),
+    ("Noumea", "New Caledonia"), ("Port Vila", "Vanuatu"), ("Los Angeles", "USA"),
+    ("Honolulu", "USA"), ("San Francisco", "USA"), ("Vancouver", "Canada"), ("London", "UK"),
+    ("Frankfurt", "Germany"), ("Rome", "Italy"), ("Paris", "France"), ("Amsterdam", "Netherlands"),
+    ("Dubai", "United Arab Emirates"), ("Doha", "Qatar"), ("Bombay", "India"), ("Colombo", "Sri Lanka"),
+    ("Beijing", "China"), ("Shanghai", "China"), ("Brunei", "Brunei"),
+]
+
+
+def route_table(n_routes, seed=0):
+    """n_routes distinct (australian_port, foreign_port, country) triples in a seeded order."""
+    foreign = list(FOREIGN_PORTS)
+    extra = 0
+    while len(AUSTRALIAN_PORTS) * len(foreign) < n_routes:
+        # more routes than real port pairs: add numbered ports in the same countries
+        port, country = FOREIGN_PORTS[extra % len(FOREIGN_PORTS)]
+        foreign.append((f"{port} {extra // len(FOREIGN_PORTS) + 2}", country))
+        extra += 1
+    pairs = [(aus, port, country) for aus in AUSTRALIAN_PORTS for port, country in foreign]
+    order = np.random.default_rng(seed).permutation(len(pairs))[:n_routes]
+    return pd.DataFrame([pairs[i] for i in sorted(order)], columns=["AustralianPort", "ForeignPort", "Country"])
+
+
+def generate(n_routes=30, n_months=120, start="1985-01-01", seasonality=0.3, noise=0.1, trend=0.03,
+             missing=0.0, seed=0):
+    """
+    Raw BITRE-schema DataFrame with n_routes x n_months rows (fewer with missing).
+
+    Parameters:
+    - seasonality: Amplitude of the yearly cycle (0.3 = +/-30%)
+    - noise: Standard deviation of the multiplicative log-normal noise
+    - trend: Average yearly growth; each route draws its own around this
+    - missing: Fraction of route-months dropped at random (gaps in the data)
+    """
+    rng = np.random.default_rng(seed)
+    routes = route_table(n_routes, seed=seed)
+    dates = pd.date_range(start, periods=n_months, freq="MS")
+
+    base = rng.lognormal(mean=7.5, sigma=1.0, size=n_routes)
+    growth = rng.normal(trend, abs(trend) / 2 + 0.01, size=n_routes)
+    phase = rng.uniform(0, 2 * np.pi, size=n_routes)
+    t = np.arange(n_months)[:, None]
+    month = dates.month.to_numpy()[:, None]
+    level = base * (1 + growth) ** (t / 12.0) * (1 + seasonality * np.sin(2 * np.pi * (month - 1) / 12 + phase))
+    total = np.maximum(level * rng.lognormal(0.0, noise, size=level.shape), 0).round()
+    share_in = np.clip(rng.normal(0.5, 0.05, size=level.shape), 0.05, 0.95)
+
+    flat = total.ravel()
+    passengers_in = np.round(flat * share_in.ravel()).astype(np.int64)
+    passengers_out = flat.astype(np.int64) - passengers_in
+    size = flat.size
+    freight_in = rng.gamma(2.0, 20.0, size)
+    freight_out = rng.gamma(2.0, 20.0, size)
+    mail_in = rng.gamma(1.5, 2.0, size)
+    mail_out = rng.gamma(1.5, 2.0, size)
+    date_col = np.repeat(dates, n_routes)
+
+    raw = pd.DataFrame({
+        "Month": date_col.strftime("%b-%y"),
+        "AustralianPort": np.tile(routes["AustralianPort"].to_numpy(), n_months),
+        "ForeignPort": np.tile(routes["ForeignPort"].to_numpy(), n_months),
+        "Country": np.tile(routes["Country"].to_numpy(), n_months),
+        "Passengers_In": passengers_in,
+        "Freight_In_(tonnes)": freight_in,
+        "Mail_In_(tonnes)": mail_in,
+        "Passengers_Out": passengers_out,
+        "Freight_Out_(tonnes)": freight_out,
+        "Mail_Out_(tonnes)": mail_out,
+        "Passengers_Total": passengers_in + passengers_out,
+        "Freight_Total_(tonnes)": freight_in + freight_out,
+        "Mail_Total_(tonnes)": mail_in + mail_out,
+        "Year": date_col.year,
+        "Month_num": date_col.month,
+    })
+    if missing > 0:
+        raw = raw[rng.random(len(raw)) >= missing].reset_index(drop=True)
+    return raw
+
+
+def write_csv(path, **kwargs):
+    """Generate a dataset (see generate) and write it like the challenge CSV."""
+    raw = generate(**kwargs)
+    raw.to_csv(path, index=False)
+    return raw
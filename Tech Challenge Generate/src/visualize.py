@@ -1,15 +1,31 @@
 """
 Static figures using matplotlib/seaborn with simple, readable code.
+
+render_route_figures draws the seasonality and time-series figures for many
+routes at once: one groupby computes every route's aggregates, figures are
+drawn in a process pool (Agg backend), and a figure is skipped when the data
+behind it has the same hash as in the last run (Outputs/figures/manifest.json).
 """
 
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import seaborn as sns
+import store
+
+FIGURE_VERSION = 1  # bump when the drawing code changes so cached figures are redrawn
+style_applied = False
 
 
 def set_style():
-    sns.set_theme(style="whitegrid", context="talk")
+    global style_applied
+    if not style_applied:
+        sns.set_theme(style="whitegrid", context="talk")
+        style_applied = True
 
 
 def save_fig(fig, path):
@@ -20,7 +36,8 @@ def save_fig(fig, path):
 
 def plot_top_bottom_routes(df, outputs_dir, top_n=10):
     set_style()
-    agg = df.groupby("route")["passengers_total"].sum().sort_values(ascending=False)
+    agg = df.groupby("route", observed=True)["passengers_total"].sum().sort_values(ascending=False)
+    agg.index = agg.index.astype(str)  # plain labels so seaborn only draws the selected routes
     top = agg.head(top_n)
     bottom = agg.tail(top_n)
 
@@ -39,16 +56,13 @@ def plot_top_bottom_routes(df, outputs_dir, top_n=10):
     save_fig(fig, os.path.join(outputs_dir, "figures", "bottom_routes.png"))
 
 
-def plot_seasonality(df, outputs_dir, route_filter=None):
-    set_style()
+def route_filename(prefix, route_filter):
+    return f"{prefix}.png" if route_filter is None else f"{prefix}_{route_filter.replace(' ', '_')}.png"
 
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
 
-    if route_filter is not None:
-        df = df[df["route"] == route_filter]
-
-    monthly = df.groupby(df["date"].dt.month)["passengers_total"].mean()
+def draw_seasonality(monthly, outputs_dir, route_filter=None):
+    """Draw average passengers per calendar month (monthly: Series indexed 1..12)."""
+    set_style()
     fig, ax = plt.subplots(figsize=(10, 5))
     sns.lineplot(x=monthly.index, y=monthly.values, marker="o", ax=ax)
     ax.set_xticks(range(1, 13))
@@ -56,37 +70,141 @@ def plot_seasonality(df, outputs_dir, route_filter=None):
     ax.set_ylabel("Average Passengers")
     title_suffix = f" — {route_filter}" if route_filter else ""
     ax.set_title("Average Monthly Seasonality (All Routes" + title_suffix + ")")
-    filename = "seasonality.png" if route_filter is None else f"seasonality_{route_filter.replace(' ', '_')}.png"
-    save_fig(fig, os.path.join(outputs_dir, "figures", filename))
+    save_fig(fig, os.path.join(outputs_dir, "figures", route_filename("seasonality", route_filter)))
+
+
+def plot_seasonality(df, outputs_dir, route_filter=None):
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df = df.assign(date=pd.to_datetime(df["date"], errors="coerce")).dropna(subset=["date"])
+    if route_filter is not None:
+        df = df[df["route"] == route_filter]
+    monthly = df.groupby(df["date"].dt.month)["passengers_total"].mean()
+    draw_seasonality(monthly, outputs_dir, route_filter)
 
 
 def plot_continent_share(df, outputs_dir):
     set_style()
-    cont = df.groupby("continent")["passengers_total"].sum().sort_values(ascending=False)
+    cont = df.groupby("continent", observed=True)["passengers_total"].sum().sort_values(ascending=False)
     fig, ax = plt.subplots(figsize=(8, 8))
     ax.pie(cont.values, labels=cont.index, autopct="%1.1f%%", startangle=90, counterclock=False)
     ax.set_title("Passenger Share by Continent")
     save_fig(fig, os.path.join(outputs_dir, "figures", "continent_share.png"))
 
 
-def plot_time_series(df, outputs_dir, route_filter=None):
+def draw_time_series(ts, outputs_dir, route_filter=None):
+    """Draw passengers over time (ts: Series indexed by date)."""
     set_style()
-    if route_filter is not None:
-        df = df[df["route"] == route_filter]
-    ts = df.groupby("date")["passengers_total"].sum().sort_index()
     fig, ax = plt.subplots(figsize=(12, 5))
     sns.lineplot(x=ts.index, y=ts.values, ax=ax)
     ax.set_title("Total Passengers Over Time" + (f" — {route_filter}" if route_filter else ""))
     ax.set_xlabel("Date")
     ax.set_ylabel("Passengers (sum)")
-    filename = "time_series.png" if route_filter is None else f"time_series_{route_filter.replace(' ', '_')}.png"
-    save_fig(fig, os.path.join(outputs_dir, "figures", filename))
+    save_fig(fig, os.path.join(outputs_dir, "figures", route_filename("time_series", route_filter)))
+
+
+def plot_time_series(df, outputs_dir, route_filter=None):
+    if route_filter is not None:
+        df = df[df["route"] == route_filter]
+    ts = df.groupby("date")["passengers_total"].sum().sort_index()
+    draw_time_series(ts, outputs_dir, route_filter)
+
+
+DRAW = {"seasonality": draw_seasonality, "time_series": draw_time_series}
+
+
+def route_aggregates(df, routes=None):
+    """
+    Figure data for all routes, each from one groupby over the whole frame.
+
+    Returns (seasonality, time_series): mean passengers as a route x calendar
+    month DataFrame, and total passengers as a Series indexed by (route, date).
+    """
+    if routes is not None:
+        df = df[df["route"].isin(routes)]
+    month = df["date"].dt.month.rename("month")
+    seasonality = df.groupby([df["route"], month], observed=True)["passengers_total"].mean().unstack("month")
+    time_series = df.groupby(["route", "date"], observed=True, sort=True)["passengers_total"].sum()
+    return seasonality, time_series
+
+
+def data_hash(series):
+    digest = hashlib.sha1(f"v{FIGURE_VERSION}".encode())
+    digest.update(np.ascontiguousarray(series.index.to_numpy()).view(np.uint8))
+    digest.update(np.ascontiguousarray(series.to_numpy(dtype=float)).view(np.uint8))
+    return digest.hexdigest()
+
+
+def init_render_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    set_style()
 
-def main():
-    df = pd.read_csv("Outputs/clean/cleaned_data.csv")
-    plot_top_bottom_routes(df, "Outputs", top_n=10)
-    plot_seasonality(df, "Outputs", "Perth → Singapore")
-    plot_continent_share(df, "Outputs")
-    plot_time_series(df, "Outputs")
 
-main()
\ No newline at end of file
+def render_jobs(jobs, outputs_dir):
+    """Draw a list of (kind, route, series) figures; runs inside a pool worker."""
+    for kind, route, series in jobs:
+        DRAW[kind](series, outputs_dir, route)
+    return len(jobs)
+
+
+def render_route_figures(df, outputs_dir, routes=None, workers=None, force=False):
+    """
+    Seasonality and time-series figures for every route (or only routes).
+
+    Parameters:
+    - routes: Route names to draw (default: all)
+    - workers: Processes for drawing (default: CPU count)
+    - force: Redraw even when the data hash matches the manifest
+
+    Returns (drawn, skipped) counts.
+    """
+    figures_dir = os.path.join(outputs_dir, "figures")
+    os.makedirs(figures_dir, exist_ok=True)
+    manifest_path = os.path.join(figures_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    jobs = []
+    skipped = 0
+    seasonality, time_series = route_aggregates(df, routes)
+    for route in seasonality.index:
+        route = str(route)
+        data = {"seasonality": seasonality.loc[route].dropna(), "time_series": time_series.loc[route]}
+        for kind, series in data.items():
+            filename = route_filename(kind, route)
+            digest = data_hash(series)
+            if not force and manifest.get(filename) == digest and os.path.exists(os.path.join(figures_dir, filename)):
+                skipped += 1
+                continue
+            manifest[filename] = digest
+            jobs.append((kind, route, series))
+
+    if jobs:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+        batches = [jobs[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker) as pool:
+            list(pool.map(render_jobs, batches, [outputs_dir] * len(batches)))
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+    return len(jobs), skipped
+
+
+def main(outputs_dir="Outputs", all_routes=False, routes=None, workers=None, force=False):
+    df = store.load_cleaned(os.path.join(outputs_dir, "clean", "cleaned_data"), columns=[
+        "date", "route", "continent", "passengers_total"])
+    plot_top_bottom_routes(df, outputs_dir, top_n=10)
+    plot_seasonality(df, outputs_dir, "Perth → Singapore")
+    plot_continent_share(df, outputs_dir)
+    plot_time_series(df, outputs_dir)
+    if all_routes or routes:
+        drawn, skipped = render_route_figures(df, outputs_dir, routes=routes, workers=workers, force=force)
+        print(f"Route figures: {drawn} drawn, {skipped} unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Shared fixtures: small synthetic BITRE datasets (synthetic.py) and their cleaned store.
+
+The project modules live flat in src/, so src is put on sys.path here.
+"""
+
+import os
+import sys
+
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import data_prep  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def split_raw(raw, n_months):
+    """(first n_months, the rest) of a raw synthetic frame."""
+    month_index = (raw["Year"] - raw["Year"].min()) * 12 + raw["Month_num"] - 1
+    return raw[month_index < n_months], raw[month_index >= n_months]
+
+
+@pytest.fixture(scope="session")
+def raw():
+    return synthetic.generate(n_routes=12, n_months=60, noise=0.05, seed=1)
+
+
+@pytest.fixture(scope="session")
+def cleaned(raw, tmp_path_factory):
+    """(cleaned DataFrame, outputs dir) of the raw fixture."""
+    outputs_dir = tmp_path_factory.mktemp("outputs")
+    csv_path = outputs_dir / "raw.csv"
+    raw.to_csv(csv_path, index=False)
+    df, _ = data_prep.clean_and_enrich(str(csv_path), str(outputs_dir))
+    return df, str(outputs_dir)
+
+
+@pytest.fixture(scope="session")
+def index(cleaned):
+    from route_index import RouteIndex
+
+    return RouteIndex(cleaned[0])
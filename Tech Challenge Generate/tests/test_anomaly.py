@@ -0,0 +1,48 @@
+import pandas as pd
+
+import anomaly
+
+
+def monthly_rows(df):
+    rows = df[["date"] + anomaly.ROUTE_KEY + ["passengers_total"]].copy()
+    for col in anomaly.ROUTE_KEY:
+        rows[col] = rows[col].astype(str)
+    rows["passengers_total"] = rows["passengers_total"].astype(float)
+    return rows
+
+
+def test_injected_drop_is_flagged(cleaned):
+    rows = monthly_rows(cleaned[0])
+    last = rows["date"].max()
+    target = rows.loc[0, anomaly.ROUTE_KEY].tolist()
+    hit = (rows[anomaly.ROUTE_KEY] == target).all(axis=1) & (rows["date"] == last)
+    rows.loc[hit, "passengers_total"] *= 0.4
+
+    detector = anomaly.AnomalyDetector()
+    detector.score(rows[rows["date"] < last])
+    scored = detector.score(rows[rows["date"] == last])
+
+    flagged = scored[scored["flag"].astype(bool)]
+    assert flagged[anomaly.ROUTE_KEY].values.tolist() == [target]
+    assert flagged["z"].iloc[0] < -anomaly.AnomalyDetector().threshold
+
+
+def test_months_already_seen_are_ignored(cleaned):
+    rows = monthly_rows(cleaned[0])
+    detector = anomaly.AnomalyDetector()
+    detector.score(rows)
+    assert detector.score(rows[rows["date"] == rows["date"].max()]).empty
+
+
+def test_detect_saves_state_and_only_scores_new_months(cleaned, tmp_path):
+    df, outputs_dir = cleaned
+    state_path = str(tmp_path / "state.parquet")
+    scored, _ = anomaly.detect(outputs_dir, state_path=state_path)
+    assert set(scored["date"]) == {df["date"].max()}
+
+    reloaded = anomaly.AnomalyDetector.load(state_path)
+    assert reloaded.last_date() == df["date"].max()
+    assert len(reloaded.state) == df["route"].nunique()
+    again, _ = anomaly.detect(outputs_dir, state_path=state_path)
+    assert again.empty
+    assert pd.api.types.is_datetime64_any_dtype(reloaded.state["last_date"])
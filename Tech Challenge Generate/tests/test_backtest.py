@@ -0,0 +1,25 @@
+import pandas as pd
+
+import backtest
+import instrument
+
+
+def fit_runs():
+    return instrument.RECORDER.totals.get("sarima_fit", {}).get("runs", 0)
+
+
+def test_results_do_not_depend_on_workers(index):
+    ts = index.series_at(0).copy()
+    tables, fits = [], []
+    for workers in [1, 2, 3]:
+        before = fit_runs()
+        tables.append(backtest.rolling_origin_backtest(ts, horizons=range(1, 4), min_train=36, refit_every=6,
+                                                       workers=workers))
+        fits.append(fit_runs() - before)
+
+    assert len(tables[0]) > 0
+    for table in tables[1:]:
+        pd.testing.assert_frame_equal(table, tables[0])
+    # one optimizer run per block of refit_every origins, also when the blocks run in workers
+    n_origins = tables[0]["origin"].nunique()
+    assert fits == [-(-n_origins // 6)] * 3
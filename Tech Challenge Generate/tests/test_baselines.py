@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import baselines
+from route_index import RouteIndex
+
+SEASON_SHAPE = np.array([5, 3, 4, 6, 8, 9, 12, 11, 8, 6, 5, 7], dtype=float)
+
+
+def seasonal_matrix(years=5, yearly_step=0.0):
+    t = np.arange(years * 12)
+    column = 100 * SEASON_SHAPE[t % 12] + yearly_step * (t // 12)
+    return np.column_stack([column, 2 * column])
+
+
+@pytest.mark.parametrize("model, yearly_step", [
+    ("seasonal_naive", 0.0),
+    ("seasonal_mean_drift", 0.0),
+    ("seasonal_mean_drift", 40.0),
+])
+def test_seasonal_models_continue_the_pattern(model, yearly_step):
+    Y = seasonal_matrix(yearly_step=yearly_step)
+    future = seasonal_matrix(years=7, yearly_step=yearly_step)
+    preds = baselines.MODELS[model](Y, np.ones_like(Y, dtype=bool), 18)
+    np.testing.assert_allclose(preds, future[len(Y):len(Y) + 18], rtol=1e-9)
+
+
+def test_fourier_regression_recovers_trend_and_seasonality():
+    t = np.arange(60, dtype=float)
+    column = 500 + 3 * t + 40 * np.sin(2 * np.pi * t / 12) + 10 * np.cos(4 * np.pi * t / 12)
+    Y = np.column_stack([column, column[::-1]])
+    mask = np.ones_like(Y, dtype=bool)
+    mask[:10, 1] = False  # masked months are ignored, not treated as zeros
+    Y[:10, 1] = 0.0
+    preds = baselines.fourier_regression(Y, mask, 6)
+    t_future = np.arange(60, 66, dtype=float)
+    expected = 500 + 3 * t_future + 40 * np.sin(2 * np.pi * t_future / 12) + 10 * np.cos(4 * np.pi * t_future / 12)
+    np.testing.assert_allclose(preds[:, 0], expected, rtol=1e-4)
+
+
+@pytest.mark.parametrize("escalate_mape", [np.inf, -1.0])
+def test_sarima_is_kept_only_where_it_beats_the_fast_tier(cleaned, tmp_path, escalate_mape):
+    df = cleaned[0]
+    index = RouteIndex(df[df["route"].isin(df["route"].unique()[:3])])
+    metrics, forecasts = baselines.tiered_forecast(index, str(tmp_path), horizon=6, escalate_mape=escalate_mape,
+                                                   workers=1)
+
+    assert metrics["escalated"].all() == (escalate_mape < 0)
+    sarima_wins = metrics["sarima_mape"] < metrics["best_mape"]
+    assert (metrics["tier"] == np.where(sarima_wins, "sarima", "fast")).all()
+    assert (metrics["model"] == np.where(sarima_wins, "sarima", metrics["best_model"])).all()
+    if escalate_mape < 0:
+        assert metrics["sarima_mape"].notna().all()
+    chosen = forecasts.groupby("route")["model"].agg(set).to_dict()
+    assert chosen == {route: {model} for route, model in zip(metrics["route"], metrics["model"])}
+    assert forecasts.groupby("route").size().eq(6).all()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cube
+
+
+def filter_df(df, year_rng, month_rng, port_vals, fport_vals, continent_vals, country_vals):
+    """The dashboard's original per-request filter over the cleaned frame."""
+    sub = df[(df["month_num"] >= month_rng[0]) & (df["month_num"] <= month_rng[1])]
+    sub = sub[(sub["year"] >= year_rng[0]) & (sub["year"] <= year_rng[1])]
+    for col, values in [("australian_port", port_vals), ("foreign_port", fport_vals),
+                        ("continent", continent_vals), ("country", country_vals)]:
+        if values:
+            sub = sub[sub[col].isin(values)]
+    return sub
+
+
+@pytest.fixture(scope="module")
+def frame(cleaned):
+    df = cleaned[0].copy()
+    for col in ["australian_port", "foreign_port", "country", "continent", "route"]:
+        df[col] = df[col].astype(str)
+    return df
+
+
+def filter_states(df):
+    years = (int(df["year"].min()), int(df["year"].max()))
+    port, country = df["australian_port"].iloc[0], df["country"].iloc[-1]
+    return [
+        ("passengers_total", years, (1, 12), (), (), (), ()),
+        ("passengers_total", (years[0] + 1, years[1] - 1), (3, 8), (port,), (), (), ()),
+        ("freight_total_tonnes", years, (1, 12), (), (), (df["continent"].iloc[0],),
+         (df["country"].iloc[0], country)),
+        ("passengers_total_z", years, (6, 6), (port, "Nowhere"), (df["foreign_port"].iloc[0],), (), ()),
+        ("passengers_total", years, (1, 12), ("Nowhere",), (), (), ()),
+    ]
+
+
+def test_queries_match_the_filter_df_groupby(frame):
+    route_cube = cube.RouteCube(frame)
+    for metric, *state in filter_states(frame):
+        result = route_cube.query(*cube.filter_state(metric, *state))
+        sub = filter_df(frame, *state)
+        expected_ts = sub.groupby("date")[metric].sum().sort_index()
+        expected_routes = sub.groupby("route")[metric].sum()
+
+        np.testing.assert_allclose(result.time_series.to_numpy(), expected_ts.to_numpy(), rtol=1e-5, atol=1e-4)
+        assert list(result.time_series.index) == list(expected_ts.index)
+        routes = result.route_totals.sort_index()
+        assert list(routes.index) == list(expected_routes.sort_index().index)
+        np.testing.assert_allclose(routes.to_numpy(), expected_routes.sort_index().to_numpy(), rtol=1e-5, atol=1e-4)
+        assert result.route_totals.is_monotonic_decreasing
+
+
+def test_query_is_memoized(frame):
+    route_cube = cube.RouteCube(frame)
+    state = cube.filter_state(*filter_states(frame)[1])
+    assert route_cube.query(*state) is route_cube.query(*state)
+    assert route_cube.query.cache_info().hits == 1
+
+
+def test_from_arrow_is_zero_copy(frame):
+    table = cube.RouteCube(frame).to_arrow()
+    restored = cube.RouteCube.from_arrow(table)
+    for name, array in [("date_code", restored.date_code), ("route_code", restored.codes["route"]),
+                        ("passengers_total", restored.values["passengers_total"])]:
+        buffer = table.column(name).chunk(0).buffers()[1]
+        assert array.ctypes.data == buffer.address
+        assert not array.flags.writeable
+
+
+def test_snapshot_cube_matches_the_frame_cube(frame, tmp_path):
+    import pyarrow as pa
+
+    import snapshot
+    import store
+
+    cleaned_path = str(tmp_path / "cleaned_data")
+    store.write_cleaned(frame, cleaned_path)
+    path = snapshot.publish_snapshot(cleaned_path)
+    allocated = pa.total_allocated_bytes()
+    mapped = snapshot.open_snapshot(path)
+    # the arrays are views of the memory map, not Arrow allocations
+    assert pa.total_allocated_bytes() - allocated < mapped.values["passengers_total"].nbytes
+
+    built = cube.RouteCube(frame)
+    for state in filter_states(frame):
+        expected, result = built.query(*cube.filter_state(*state)), mapped.query(*cube.filter_state(*state))
+        pd.testing.assert_series_equal(result.time_series, expected.time_series, check_freq=False)
+        pd.testing.assert_series_equal(result.route_totals, expected.route_totals)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_prep
+import store
+from conftest import split_raw
+
+KEY = ["date", "australian_port", "country", "foreign_port"]
+
+
+def load_sorted(outputs_dir):
+    df = store.load_cleaned(f"{outputs_dir}/clean/cleaned_data")
+    for col in KEY[1:]:
+        df[col] = df[col].astype(str)
+    return df.sort_values(KEY).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def rebuilt(raw, tmp_path_factory):
+    outputs_dir = tmp_path_factory.mktemp("full")
+    raw.to_csv(outputs_dir / "raw.csv", index=False)
+    data_prep.clean_and_enrich(str(outputs_dir / "raw.csv"), str(outputs_dir))
+    return load_sorted(outputs_dir)
+
+
+@pytest.mark.parametrize("restate", [False, True])
+def test_append_matches_full_rebuild(raw, rebuilt, tmp_path, restate):
+    history, new = split_raw(raw, 48)
+    history.to_csv(tmp_path / "history.csv", index=False)
+    new.to_csv(tmp_path / "new.csv", index=False)
+    data_prep.clean_and_enrich(str(tmp_path / "history.csv"), str(tmp_path))
+    appended_rows, _ = data_prep.append_months(str(tmp_path / "new.csv"), str(tmp_path), restate=restate)
+    appended = load_sorted(tmp_path)
+
+    assert len(appended) == len(rebuilt)
+    pd.testing.assert_series_equal(appended["passengers_total"], rebuilt["passengers_total"])
+    z, z_full = appended["passengers_total_z"].to_numpy(), rebuilt["passengers_total_z"].to_numpy()
+    new_rows = (appended["date"] >= appended_rows["date"].min()).to_numpy()
+    # new rows are scored against the merged statistics; old rows only change with restate
+    np.testing.assert_allclose(z[new_rows], z_full[new_rows], rtol=1e-5, atol=1e-5)
+    if restate:
+        np.testing.assert_allclose(z, z_full, rtol=1e-5, atol=1e-5)
+
+
+def test_append_refuses_months_already_stored(raw, tmp_path):
+    history, _ = split_raw(raw, 48)
+    history.to_csv(tmp_path / "history.csv", index=False)
+    data_prep.clean_and_enrich(str(tmp_path / "history.csv"), str(tmp_path))
+    with pytest.raises(ValueError, match="not newer"):
+        data_prep.append_months(str(tmp_path / "history.csv"), str(tmp_path))
+
+
+def test_append_computes_trailing_features(raw, tmp_path):
+    names = ["passengers_rolling_12", "passengers_yoy_growth", "load_balance_trend_12"]
+    raw.to_csv(tmp_path / "raw.csv", index=False)
+    data_prep.clean_and_enrich(str(tmp_path / "raw.csv"), str(tmp_path / "full"), extra_features=names)
+    rebuilt = load_sorted(tmp_path / "full")
+
+    history, new = split_raw(raw, 48)
+    history.to_csv(tmp_path / "history.csv", index=False)
+    new.to_csv(tmp_path / "new.csv", index=False)
+    data_prep.clean_and_enrich(str(tmp_path / "history.csv"), str(tmp_path / "inc"), extra_features=names)
+    data_prep.append_months(str(tmp_path / "new.csv"), str(tmp_path / "inc"))
+    appended = load_sorted(tmp_path / "inc")
+
+    for name in names:
+        assert appended[name].notna().sum() == rebuilt[name].notna().sum()
+        np.testing.assert_allclose(appended[name], rebuilt[name], rtol=1e-5, equal_nan=True)
+
+
+def test_append_refuses_whole_history_features(raw, tmp_path):
+    history, new = split_raw(raw, 48)
+    history.to_csv(tmp_path / "history.csv", index=False)
+    new.to_csv(tmp_path / "new.csv", index=False)
+    data_prep.clean_and_enrich(str(tmp_path / "history.csv"), str(tmp_path), extra_features=["seasonal_index"])
+    with pytest.raises(ValueError, match="seasonal_index"):
+        data_prep.append_months(str(tmp_path / "new.csv"), str(tmp_path))
+    assert len(store.list_parts(f"{tmp_path}/clean/cleaned_data")) == 1
+
+
+def test_streaming_rejects_features(tmp_path):
+    import cli
+
+    with pytest.raises(SystemExit):
+        cli.main(["--outputs", str(tmp_path), "clean", "--streaming", "--features", "seasonal_index"])
+    assert not (tmp_path / "clean").exists()
+
+
+def test_streaming_matches_full_clean(raw, rebuilt, tmp_path):
+    raw.to_csv(tmp_path / "raw.csv", index=False)
+    _, stats = data_prep.clean_and_enrich_streaming(str(tmp_path / "raw.csv"), str(tmp_path), chunksize=97)
+    streamed = load_sorted(tmp_path)
+
+    assert len(store.list_parts(f"{tmp_path}/clean/cleaned_data")) > 1
+    assert int(stats["count"].sum()) == len(rebuilt)
+    assert list(streamed.columns) == list(rebuilt.columns)
+    for col in streamed.columns:
+        if col == "passengers_total_z":
+            np.testing.assert_allclose(streamed[col], rebuilt[col], rtol=1e-5, atol=1e-5)
+        else:
+            assert streamed[col].astype(str).tolist() == rebuilt[col].astype(str).tolist(), col
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+import features
+
+
+def groupby_z_score(df):
+    """The per-route groupby.apply z-score that route_z_score replaced."""
+
+    def compute_group_z(group):
+        values = group["passengers_total"].astype(float)
+        std_value = values.std(ddof=0)
+        if std_value == 0 or pd.isna(std_value):
+            return pd.Series([0.0] * len(group), index=group.index)
+        return (values - values.mean()) / std_value
+
+    return df.groupby("route", group_keys=False).apply(compute_group_z)
+
+
+def test_route_z_score_matches_groupby_apply(cleaned):
+    df = cleaned[0][["route", "date", "passengers_total"]].copy()
+    df["route"] = df["route"].astype(str)
+    flat = df[df["route"] == df["route"].iloc[0]].assign(route="Flat → Route", passengers_total=7)
+    df = pd.concat([df, flat, flat.iloc[:1].assign(route="Single → Row")], ignore_index=True)
+
+    z = features.route_z_score(df, features.RouteMonthLayout(df))
+    expected = groupby_z_score(df).sort_index().to_numpy()
+    np.testing.assert_allclose(z, expected, rtol=1e-10, atol=1e-10)
+    assert (z[df["route"].isin(["Flat → Route", "Single → Row"]).to_numpy()] == 0).all()
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import hierarchy
+
+
+@pytest.mark.parametrize("method", hierarchy.METHODS)
+def test_reconciled_forecasts_are_coherent(index, method):
+    result = hierarchy.hierarchical_forecast(index, method=method, horizon=6)
+    routes = index.routes.assign(route=index.routes["route"].astype(str))
+
+    for _, group in result.groupby("date"):
+        reconciled = group.set_index(["level", "node"])["reconciled"]
+        by_route = reconciled["route"].reindex(routes["route"]).to_numpy()
+        assert reconciled[("total", "Total")] == pytest.approx(by_route.sum(), rel=1e-8)
+        for level in hierarchy.LEVELS:
+            sums = routes.assign(value=by_route).groupby(level)["value"].sum()
+            np.testing.assert_allclose(reconciled[level].reindex(sums.index.astype(str)).to_numpy(),
+                                       sums.to_numpy(), rtol=1e-8)
+
+
+def test_bottom_up_keeps_route_forecasts(index):
+    S, nodes = hierarchy.summing_matrix(index.routes)
+    base = np.random.default_rng(0).uniform(100, 1000, size=(3, S.shape[0]))
+    reconciled = hierarchy.reconcile(S, base, method="bottom_up")
+    n_routes = S.shape[1]
+    np.testing.assert_allclose(reconciled[:, -n_routes:], base[:, -n_routes:])
+    np.testing.assert_allclose(reconciled[:, 0], base[:, -n_routes:].sum(axis=1))
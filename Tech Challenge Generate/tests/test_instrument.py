@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import instrument
+
+
+def staged_square(x):
+    with instrument.stage("square", value=x):
+        return x * x
+
+
+def failing_stage(x):
+    with instrument.stage("doomed"):
+        raise ValueError(x)
+
+
+def test_worker_records_reach_the_parent_recorder():
+    before = instrument.RECORDER.totals.get("square", {}).get("runs", 0)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        assert instrument.map_collected(pool, staged_square, [1, 2, 3]) == [1, 4, 9]
+    assert instrument.RECORDER.totals["square"]["runs"] == before + 3
+    labels = {r["labels"]["value"] for r in instrument.RECORDER.records if r["stage"] == "square"}
+    assert {"1", "2", "3"} <= labels
+
+
+def test_records_of_a_failed_task_are_kept():
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        with pytest.raises(ValueError):
+            instrument.map_collected(pool, failing_stage, [1])
+    assert instrument.RECORDER.totals["doomed"]["failures"] >= 1
+
+
+def test_collect_only_sees_records_inside_the_block():
+    with instrument.stage("outside"):
+        pass
+    with instrument.RECORDER.collect() as records:
+        with instrument.stage("inside"):
+            pass
+    assert [r["stage"] for r in records] == ["inside"]
@@ -0,0 +1,51 @@
+import os
+import time
+
+import numpy as np
+
+from model_store import ModelStore, RefitPolicy
+
+
+def route_series(index):
+    return index.series_at(0).copy()
+
+
+def test_hit_extend_warm_and_cold_transitions(index, tmp_path):
+    ts = route_series(index)
+    models = ModelStore(str(tmp_path), policy=RefitPolicy(warm_after_obs=3, cold_after_obs=6))
+
+    cold, action = models.fit("route", ts[:36])
+    assert action == "cold"
+    hit, action = models.fit("route", ts[:36])
+    assert action == "hit"
+    np.testing.assert_array_equal(hit.params, cold.params)
+    extended, action = models.fit("route", ts[:37])
+    assert action == "extend"
+    np.testing.assert_array_equal(extended.params, cold.params)
+    assert models.fit("route", ts[:39])[1] == "warm"
+    assert models.fit("route", ts[:40])[1] == "extend"
+    # 6 months since the cold fit at 36
+    assert models.fit("route", ts[:42])[1] == "cold"
+
+    restated = ts[:43].copy()
+    restated.iloc[5] += 100
+    assert models.fit("route", restated)[1] == "cold"
+
+
+def test_old_cold_fit_is_refitted(index, tmp_path):
+    ts = route_series(index)
+    models = ModelStore(str(tmp_path), policy=RefitPolicy(max_age_days=0))
+    models.fit("route", ts[:36])
+    time.sleep(0.01)
+    assert models.fit("route", ts[:37])[1] == "cold"
+
+
+def test_evict_drops_idle_then_least_recently_used(tmp_path):
+    models = ModelStore(str(tmp_path))
+    now = time.time()
+    for name, idle_days in [("a", 400), ("b", 30), ("c", 20), ("d", 10)]:
+        models.save(os.path.join(str(tmp_path), f"{name}.json"), {"last_used": now - idle_days * 86400})
+
+    assert models.evict(max_idle_days=180) == 1
+    assert models.evict(max_idle_days=180, max_entries=2) == 1
+    assert sorted(os.listdir(tmp_path)) == ["c.json", "d.json"]
@@ -0,0 +1,47 @@
+import pytest
+
+import order_search
+
+BOUNDS = {"max_p": 2, "max_q": 1, "max_P": 1, "max_Q": 1}
+
+
+@pytest.mark.parametrize("spec", [((0, 1, 0), (0, 1, 0, 12)), ((2, 1, 1), (1, 1, 1, 12)), ((1, 0, 1), (0, 1, 1, 12))])
+@pytest.mark.parametrize("vary_differencing", [False, True])
+def test_neighbours_stay_within_bounds(spec, vary_differencing):
+    found = order_search.neighbours(spec, vary_differencing=vary_differencing, **BOUNDS)
+    assert found and spec not in found
+    assert len(set(found)) == len(found)
+    for (p, d, q), (P, D, Q, s) in found:
+        assert 0 <= p <= 2 and 0 <= q <= 1 and 0 <= P <= 1 and 0 <= Q <= 1 and s == 12
+        changed_differencing = (d, D) != (spec[0][1], spec[1][1])
+        assert not changed_differencing or vary_differencing
+
+
+def test_stepwise_search_never_ends_worse_than_the_start(index):
+    ts = index.series_at(0).copy()
+    start = order_search.DEFAULT_START
+    spec, score, evaluated = order_search.stepwise_search(ts, start=start, max_rounds=1, full_keep=1,
+                                                          prefit_maxiter=5, workers=1)
+    assert score <= order_search.score_spec(ts, start)[1]
+    assert evaluated == 1 + len(order_search.neighbours(start))
+
+
+def test_cached_orders_are_reused_until_stale_or_forced(monkeypatch, tmp_path):
+    searches = []
+
+    def fake_search(ts, **kwargs):
+        searches.append(kwargs)
+        return ((2, 1, 0), (0, 1, 1, 12)), 1.0, 5
+
+    monkeypatch.setattr(order_search, "stepwise_search", fake_search)
+    cache_path = str(tmp_path / "orders.json")
+    ts = list(range(30))
+
+    assert order_search.select_order(("A", "B", "C"), ts, cache_path=cache_path) == (((2, 1, 0), (0, 1, 1, 12)), False)
+    assert order_search.select_order(("A", "B", "C"), ts, cache_path=cache_path) == (((2, 1, 0), (0, 1, 1, 12)), True)
+    assert order_search.cached_order(("A", "B", "C"), cache_path=cache_path) == ((2, 1, 0), (0, 1, 1, 12))
+    assert order_search.select_order(("A", "B", "C"), ts, cache_path=cache_path, force=True)[1] is False
+    assert order_search.select_order(("A", "B", "C"), ts, cache_path=cache_path, max_age_days=-1)[1] is False
+    assert order_search.select_order(("X", "Y", "Z"), ts, cache_path=cache_path)[1] is False
+    assert len(searches) == 4
+    assert set(order_search.load_order_cache(cache_path)) == {"A | B | C", "X | Y | Z"}
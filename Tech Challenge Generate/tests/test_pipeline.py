@@ -0,0 +1,89 @@
+import ast
+import json
+import os
+import shutil
+
+import pytest
+
+import cli
+import pipeline
+
+
+def copy_stage(tmp_path, name="copy", source="input.txt", target="output.txt", after=()):
+    return pipeline.Stage(name, shutil.copyfile, inputs=[str(tmp_path / source)], outputs=[str(tmp_path / target)],
+                          params={"src": str(tmp_path / source), "dst": str(tmp_path / target)}, after=after)
+
+
+def test_stage_reruns_only_when_an_input_changes(tmp_path):
+    (tmp_path / "input.txt").write_text("one")
+    stages = [copy_stage(tmp_path), copy_stage(tmp_path, "copy2", "output.txt", "output2.txt", after=["copy"])]
+    manifest = str(tmp_path / "manifest.json")
+
+    assert pipeline.run_pipeline(stages, manifest) == {"copy": "ran", "copy2": "ran"}
+    assert pipeline.run_pipeline(stages, manifest) == {"copy": "skipped", "copy2": "skipped"}
+    (tmp_path / "input.txt").write_text("two")
+    assert pipeline.run_pipeline(stages, manifest, dry_run=True) == {"copy": "would_run", "copy2": "would_run"}
+    assert pipeline.run_pipeline(stages, manifest) == {"copy": "ran", "copy2": "ran"}
+    assert (tmp_path / "output2.txt").read_text() == "two"
+
+    os.remove(tmp_path / "output2.txt")
+    assert pipeline.run_pipeline(stages, manifest) == {"copy": "skipped", "copy2": "ran"}
+    assert pipeline.run_pipeline(stages, manifest, force=["copy2"]) == {"copy": "skipped", "copy2": "ran"}
+
+
+def test_failed_forced_run_invalidates_the_stage(tmp_path):
+    target = tmp_path / "victim.txt"
+    target.write_text("x")
+    stages = [pipeline.Stage("remove", os.remove, inputs=[], outputs=[], params={"path": str(target)})]
+    manifest = str(tmp_path / "manifest.json")
+
+    assert pipeline.run_pipeline(stages, manifest) == {"remove": "ran"}
+    assert pipeline.run_pipeline(stages, manifest, force=["remove"]) == {"remove": "failed"}
+    assert pipeline.run_pipeline(stages, manifest) == {"remove": "failed"}
+    with open(manifest, encoding="utf-8") as f:
+        assert "remove" not in json.load(f)["stages"]
+
+
+def test_unknown_forced_stage_is_an_error(tmp_path):
+    (tmp_path / "input.txt").write_text("one")
+    with pytest.raises(ValueError, match="unknown stages"):
+        pipeline.run_pipeline([copy_stage(tmp_path)], str(tmp_path / "manifest.json"), force=["copi"])
+
+
+def test_every_stage_depends_on_the_pipeline_module():
+    pipeline_py = os.path.join(pipeline.SRC_DIR, "pipeline.py")
+    assert all(pipeline_py in stage.inputs for stage in pipeline.default_stages())
+
+
+def test_stages_depend_on_every_project_module_they_import():
+    for stage in pipeline.default_stages():
+        listed = {path for path in stage.inputs if path.endswith(".py")}
+        # pipeline.py imports every stage's module inside its run_* function
+        for path in listed - {os.path.join(pipeline.SRC_DIR, "pipeline.py")}:
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+            for node in ast.walk(tree):
+                names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else (
+                    [node.module] if isinstance(node, ast.ImportFrom) and node.module else [])
+                for name in names:
+                    imported = os.path.join(pipeline.SRC_DIR, f"{name}.py")
+                    if os.path.exists(imported):
+                        assert imported in listed, f"{stage.name}: {os.path.basename(path)} imports {name}"
+
+
+@pytest.mark.parametrize("argv, expected", [
+    ([], ()),
+    (["--force"], True),
+    (["--force", "all"], True),
+    (["--force", "plot"], ["plot"]),
+])
+def test_cli_force_flag(monkeypatch, tmp_path, argv, expected):
+    calls = {}
+
+    def fake_main(*args, **kwargs):
+        calls.update(kwargs)
+        return {}
+
+    monkeypatch.setattr(pipeline, "main", fake_main)
+    cli.main(["--outputs", str(tmp_path), "pipeline"] + argv)
+    assert calls["force"] == expected
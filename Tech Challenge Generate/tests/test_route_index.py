@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_route_series_are_read_only(index):
+    key = tuple(index.routes.loc[0, ["australian_port", "country", "foreign_port"]])
+    series = index.series(*key)
+    before = index.aggregate("continent").to_numpy().copy()
+    with pytest.raises(ValueError):
+        series.iloc[0] = -1.0
+    np.testing.assert_array_equal(index.aggregate("continent").to_numpy(), before)
+
+
+def test_select_route_matches_for_frame_and_index(cleaned):
+    import forecast
+    from route_index import RouteIndex
+
+    df = cleaned[0]
+    key = tuple(df.loc[0, ["australian_port", "country", "foreign_port"]])
+    on_route = (df[["australian_port", "country", "foreign_port"]] == key).all(axis=1)
+    dates = sorted(df.loc[on_route, "date"].unique())
+    gappy = df[~(on_route & (df["date"] == dates[5]))]
+
+    from_frame = forecast.select_route(gappy, *key)
+    from_index = forecast.select_route(RouteIndex(gappy), *key)
+    pd.testing.assert_series_equal(from_frame, from_index, check_freq=False)
+    assert from_frame[dates[5]] == 0.0
+    assert len(from_frame) == len(dates)
@@ -0,0 +1,58 @@
+import pytest
+
+import instrument
+import serve
+
+
+@pytest.fixture(scope="module")
+def service(index):
+    service = serve.ForecastService(index, workers=1)
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope="module")
+def route(index):
+    return "|".join(index.routes.loc[0, ["australian_port", "country", "foreign_port"]])
+
+
+def fit_runs():
+    return instrument.RECORDER.totals.get("sarima_fit", {}).get("runs", 0)
+
+
+def test_identical_requests_share_one_fit(service, route):
+    before = fit_runs()
+    first = service.submit(route, horizon=3, train_end="1988-01-01")
+    second = service.submit(route, horizon=3, train_end="1988-01-01")
+    assert second is first
+    response = first.result(timeout=120)
+    assert len(response["forecast"]) == 3 and not response["cached"]
+    assert fit_runs() == before + 1
+
+    again = service.forecast(route, horizon=3, train_end="1988-01-01")
+    assert again["cached"] and again["forecast"] == response["forecast"]
+    # a new horizon reuses the fitted params instead of fitting again
+    longer = service.forecast(route, horizon=6, train_end="1988-01-01")
+    values = [point["predicted_passengers"] for point in response["forecast"]]
+    assert [point["predicted_passengers"] for point in longer["forecast"][:3]] == pytest.approx(values)
+    assert fit_runs() == before + 1
+
+
+def test_train_end_is_normalised_to_month_start(service, route):
+    first = service.forecast(route, horizon=2, train_end="1987-06-15")
+    assert first["train_end"] == "1987-06-01"
+    assert first["forecast"][0]["date"] == "1987-07-01"
+    assert service.forecast(route, horizon=2, train_end="1987-06-01")["cached"]
+
+
+@pytest.mark.parametrize("train_end", ["2030-01-01", "1970-01-01"])
+def test_train_end_outside_the_data_is_rejected(service, route, train_end):
+    with pytest.raises(ValueError, match="train_end must be between"):
+        service.submit(route, horizon=2, train_end=train_end)
+
+
+def test_unknown_route_and_bad_horizon(service, route):
+    with pytest.raises(KeyError):
+        service.submit("Nowhere → Atlantis")
+    with pytest.raises(ValueError, match="horizon"):
+        service.submit(route, horizon=0)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import store
+
+
+def test_compact_dtypes_warns_about_coerced_counts():
+    df = pd.DataFrame({"passengers_total": [10, None, "n/a", 40]})
+    with pytest.warns(UserWarning, match="passengers_total: 2 missing or non-numeric values"):
+        compacted = store.compact_dtypes(df)
+    assert compacted["passengers_total"].dtype == np.int32
+
+
+def test_store_round_trip_and_pushdown_filters(cleaned):
+    df, outputs_dir = cleaned
+    path = f"{outputs_dir}/clean/cleaned_data"
+    loaded = store.load_cleaned(path)
+    assert loaded["passengers_total"].dtype == np.int32
+    assert isinstance(loaded["route"].dtype, pd.CategoricalDtype)
+    assert loaded["passengers_total"].sum() == df["passengers_total"].sum()
+
+    port = str(df["australian_port"].iloc[0])
+    start = df["date"].min() + pd.offsets.MonthBegin(24)
+    subset = store.load_cleaned(path, columns=["date", "australian_port", "passengers_total"], start=start,
+                                australian_ports=[port])
+    expected = df[(df["date"] >= start) & (df["australian_port"].astype(str) == port)]
+    assert list(subset.columns) == ["date", "australian_port", "passengers_total"]
+    assert len(subset) == len(expected)
+    assert subset["passengers_total"].sum() == expected["passengers_total"].sum()
+    assert list(subset["australian_port"].cat.categories) == [port]
@@ -0,0 +1,31 @@
+import pandas as pd
+
+import synthetic
+
+RAW_COLUMNS = ["Month", "AustralianPort", "ForeignPort", "Country", "Passengers_In", "Freight_In_(tonnes)",
+               "Mail_In_(tonnes)", "Passengers_Out", "Freight_Out_(tonnes)", "Mail_Out_(tonnes)",
+               "Passengers_Total", "Freight_Total_(tonnes)", "Mail_Total_(tonnes)", "Year", "Month_num"]
+
+
+def test_generate_has_the_challenge_schema():
+    raw = synthetic.generate(n_routes=7, n_months=18, seed=3)
+    assert list(raw.columns) == RAW_COLUMNS
+    assert len(raw) == 7 * 18
+    assert raw.groupby(["AustralianPort", "ForeignPort"]).ngroups == 7
+    assert (raw["Passengers_In"] + raw["Passengers_Out"] == raw["Passengers_Total"]).all()
+    assert (raw["Passengers_Total"] >= 0).all()
+    assert raw["Month"].iloc[0] == "Jan-85"
+
+
+def test_generate_is_seeded():
+    pd.testing.assert_frame_equal(synthetic.generate(n_routes=5, n_months=12, seed=4),
+                                  synthetic.generate(n_routes=5, n_months=12, seed=4))
+    assert not synthetic.generate(n_routes=5, n_months=12, seed=4).equals(
+        synthetic.generate(n_routes=5, n_months=12, seed=5))
+
+
+def test_more_routes_than_port_pairs_and_missing_months():
+    n_pairs = len(synthetic.AUSTRALIAN_PORTS) * len(synthetic.FOREIGN_PORTS)
+    assert len(synthetic.route_table(n_pairs + 10).drop_duplicates()) == n_pairs + 10
+    raw = synthetic.generate(n_routes=20, n_months=24, missing=0.25, seed=0)
+    assert 0.6 * 480 < len(raw) < 0.9 * 480
@@ -0,0 +1,14 @@
+import visualize
+
+
+def test_route_figures_redraw_only_changed_routes(cleaned, tmp_path):
+    df = cleaned[0]
+    routes = sorted(df["route"].astype(str).unique())[:2]
+    assert visualize.render_route_figures(df, str(tmp_path), routes=routes, workers=1) == (4, 0)
+    assert visualize.render_route_figures(df, str(tmp_path), routes=routes, workers=1) == (0, 4)
+
+    changed = df.copy()
+    rows = (changed["route"] == routes[0]) & (changed["date"] == changed["date"].max())
+    changed.loc[rows, "passengers_total"] *= 2
+    assert visualize.render_route_figures(changed, str(tmp_path), routes=routes, workers=1) == (2, 2)
+    assert visualize.render_route_figures(changed, str(tmp_path), routes=routes, workers=1, force=True) == (4, 0)